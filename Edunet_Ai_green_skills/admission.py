@@ -0,0 +1,149 @@
+"""
+Admission control for inference endpoints
+At most max_in_flight inference requests run at once. Up to max_queue more
+wait, each for at most queue_timeout seconds; anything beyond that is shed
+immediately with 429 (queue full) or 503 (waited too long) and a
+Retry-After hint. Requests to other paths bypass the controller entirely,
+so cheap endpoints such as /health stay responsive under load.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from fastapi.responses import JSONResponse
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, deadline-limited wait queue"""
+
+    def __init__(self, max_in_flight=4, max_queue=16, queue_timeout=2.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+
+        # Counters
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        # Smoothed service time, used for Retry-After
+        self.service_seconds = 0.05
+
+    def retry_after(self):
+        """Seconds until a retry is likely to be admitted (at least 1)"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self.service_seconds * backlog / self.max_in_flight))
+
+    async def acquire(self):
+        """Wait for an inference slot; raises AdmissionRejected when shed"""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise AdmissionRejected(429, "Too many queued requests", self.retry_after())
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.shed_timeout += 1
+            raise AdmissionRejected(503, "Timed out waiting for capacity", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away; hand on a slot we may already have been given
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+        waited = time.monotonic() - start
+        self.queue_seconds_total += waited
+        self.queue_seconds_max = max(self.queue_seconds_max, waited)
+        self.admitted += 1
+
+    def _discard(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, service_seconds=None):
+        """Free a slot, handing it straight to the oldest waiter if any"""
+        if service_seconds is not None:
+            self.service_seconds = 0.9 * self.service_seconds + 0.1 * service_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'queue_timeout_seconds': self.queue_timeout,
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'shed_queue_full': self.shed_queue_full,
+            'shed_timeout': self.shed_timeout,
+            'queue_seconds_total': round(self.queue_seconds_total, 6),
+            'queue_seconds_max': round(self.queue_seconds_max, 6),
+            'service_seconds_avg': round(self.service_seconds, 6),
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to some path prefixes"""
+
+    def __init__(self, app, controller, limited_prefixes):
+        self.app = app
+        self.controller = controller
+        self.limited_prefixes = tuple(limited_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(self.limited_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire()
+        except AdmissionRejected as rejected:
+            response = JSONResponse(
+                status_code=rejected.status_code,
+                content={'detail': rejected.reason},
+                headers={'Retry-After': str(rejected.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - start)
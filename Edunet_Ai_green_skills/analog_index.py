@@ -0,0 +1,182 @@
+"""
+Nearest-analog lookup over historical readings
+A KD-tree over standardized feature vectors from every location's dataset
+returns the k most similar recorded conditions, with the oxygen level and
+people count observed for them. The index records the SHA-256 of every
+dataset it was built from, so a stale saved index is detected and rebuilt.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from glob import glob
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.neighbors import KDTree
+
+from data_schema import FEATURE_COLS, TARGET_OXYGEN, TARGET_PEOPLE
+from digests import file_digest
+from stats_index import json_float, location_name_from_file
+
+def source_digests(datasets_dir):
+    """SHA-256 of every dataset CSV, keyed by file name"""
+    return {
+        os.path.basename(file): file_digest(file)
+        for file in sorted(glob(os.path.join(datasets_dir, "*.csv")))
+    }
+
+def _fingerprints(datasets_dir):
+    """Cheap change check: (size, mtime) of every dataset CSV"""
+    fingerprints = {}
+    for file in glob(os.path.join(datasets_dir, "*.csv")):
+        info = os.stat(file)
+        fingerprints[os.path.basename(file)] = (info.st_size, info.st_mtime_ns)
+    return fingerprints
+
+
+class AnalogIndex:
+    """KD-tree over standardized feature vectors with per-row outcomes"""
+
+    def __init__(self, features, locations, location_names, oxygen, people, leaf_size=40,
+                 source_digests=None):
+        features = np.asarray(features, dtype=float)
+        self.mean = features.mean(axis=0)
+        self.scale = features.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        self.tree = KDTree((features - self.mean) / self.scale, leaf_size=leaf_size)
+
+        # Per-row metadata (locations stored as codes into location_names)
+        self.locations = np.asarray(locations, dtype=np.int32)
+        self.location_names = list(location_names)
+        self.oxygen = np.asarray(oxygen, dtype=float)
+        self.people = np.asarray(people, dtype=float)
+
+        # {file name: sha256} of the datasets the index was built from
+        self.source_digests = dict(source_digests or {})
+
+    @classmethod
+    def from_datasets(cls, datasets_dir):
+        """Build the index from every CSV in datasets_dir"""
+        frames = []
+        location_names = []
+        digests = {}
+        for code, file in enumerate(sorted(glob(os.path.join(datasets_dir, "*.csv")))):
+            # Hash the same bytes that are parsed, so the digests match the rows
+            with open(file, 'rb') as f:
+                content = f.read()
+            digests[os.path.basename(file)] = hashlib.sha256(content).hexdigest()
+            df = pd.read_csv(io.BytesIO(content)).dropna(subset=FEATURE_COLS)
+            frames.append(pd.DataFrame({
+                **{col: df[col] for col in FEATURE_COLS},
+                'location': code,
+                TARGET_OXYGEN: df[TARGET_OXYGEN] if TARGET_OXYGEN in df.columns else np.nan,
+                TARGET_PEOPLE: df[TARGET_PEOPLE] if TARGET_PEOPLE in df.columns else np.nan,
+            }))
+            location_names.append(location_name_from_file(file))
+
+        data = pd.concat(frames, ignore_index=True)
+        return cls(
+            data[FEATURE_COLS].values, data['location'].values, location_names,
+            data[TARGET_OXYGEN].values, data[TARGET_PEOPLE].values,
+            source_digests=digests
+        )
+
+    def __len__(self):
+        return len(self.locations)
+
+    def is_current(self, digests):
+        """Whether the index was built from datasets with these digests"""
+        # Indexes saved before digests were recorded are always stale
+        return getattr(self, 'source_digests', None) == digests
+
+    def save(self, path):
+        """Persist the index with joblib"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        """Load an index saved with save()"""
+        return joblib.load(path)
+
+    def query(self, feature_values, k=5):
+        """
+        k nearest historical readings to a {column: value} dict
+        Distances are in standardized units
+        """
+        x = np.array([[feature_values[col] for col in FEATURE_COLS]], dtype=float)
+        k = min(k, len(self))
+        distances, indices = self.tree.query((x - self.mean) / self.scale, k=k)
+
+        stored = np.asarray(self.tree.get_arrays()[0])
+        neighbors = []
+        for distance, i in zip(distances[0], indices[0]):
+            features = stored[i] * self.scale + self.mean
+            neighbors.append({
+                'location': self.location_names[self.locations[i]],
+                'distance': round(float(distance), 4),
+                'features': {col: float(value) for col, value in zip(FEATURE_COLS, features)},
+                'oxygen_level': json_float(self.oxygen[i]),
+                'number_of_people': None if np.isnan(self.people[i]) else int(self.people[i])
+            })
+        return neighbors
+
+
+def load_or_build(path, datasets_dir, digests=None):
+    """
+    The index saved at path if it was built from the current datasets,
+    otherwise a new one built from datasets_dir (and saved to path)
+    Returns (index, rebuilt)
+    """
+    if digests is None:
+        digests = source_digests(datasets_dir)
+    if os.path.exists(path):
+        try:
+            index = AnalogIndex.load(path)
+        except Exception:
+            index = None  # Unreadable (e.g. written by another version): rebuild
+        if index is not None and index.is_current(digests):
+            return index, False
+    index = AnalogIndex.from_datasets(datasets_dir)
+    index.save(path)
+    return index, True
+
+
+class AnalogIndexFile:
+    """
+    Keeps a served index in sync with the dataset files
+    refresh() is cheap between checks: file sizes and mtimes are compared
+    at most every refresh_interval seconds, and only when they moved are
+    the files hashed and the index reloaded or rebuilt
+    """
+
+    def __init__(self, path, datasets_dir, refresh_interval=0.0):
+        self.path = path
+        self.datasets_dir = datasets_dir
+        self.refresh_interval = refresh_interval
+        self.index = None
+        self._fingerprints = None
+        self._last_refresh = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Reload or rebuild the index if the datasets changed; returns whether it did"""
+        now = time.monotonic()
+        if (not force and self._last_refresh is not None
+                and now - self._last_refresh < self.refresh_interval):
+            return False
+        with self._lock:
+            self._last_refresh = now
+            fingerprints = _fingerprints(self.datasets_dir)
+            if self.index is not None and fingerprints == self._fingerprints:
+                return False
+            digests = source_digests(self.datasets_dir)
+            self._fingerprints = fingerprints
+            if self.index is not None and self.index.is_current(digests):
+                return False
+            self.index, rebuilt = load_or_build(self.path, self.datasets_dir, digests)
+            print(f"✓ Analog index {'rebuilt' if rebuilt else 'loaded'}: {len(self.index)} readings")
+            return True
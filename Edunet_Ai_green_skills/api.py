@@ -3,14 +3,30 @@ Phase 3: Backend Logic - FastAPI Backend
 REST API for predicting Oxygen Level and Number of People
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
-import pandas as pd
+import asyncio
+import hashlib
+import numpy as np
 import joblib
+import json
 import os
-from glob import glob
+import threading
+import time
+
+from admission import AdmissionController, AdmissionMiddleware
+from analog_index import AnalogIndexFile
+from data_schema import find_violations
+from model_registry import ModelRegistry, parse_version
+from profiling import Profiler, ProfileStore
+from serialization import render, parse_fields, select_fields
+from shadow import ShadowScorer
+from specialists import ModelEntry, SpecialistRouter
+from stats_index import StatsIndex, STATS_COLS
+from streaming import StreamHub
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -19,6 +35,20 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control for inference: at most ADMISSION_MAX_IN_FLIGHT requests run
+# at once and ADMISSION_QUEUE_SIZE wait up to ADMISSION_QUEUE_TIMEOUT seconds.
+# Other endpoints (/health, /locations, ...) are not limited.
+admission = AdmissionController(
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "4")),
+    max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "16")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission,
+    limited_prefixes=["/predict", "/analogs"]
+)
+
 # Enable CORS for frontend/mobile integration
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +61,41 @@ app.add_middleware(
 # Constants
 DATASETS_DIR = "Datasets"
 MODELS_DIR = "models"
+SPECIALISTS_DIR = os.path.join(MODELS_DIR, "specialists")
+ANALOG_INDEX_FILE = os.path.join(MODELS_DIR, "analog_index.pkl")
+
+# Most per-location specialists kept in memory at once; by default all of
+# them, so requests covering every location never evict what they reuse
+SPECIALIST_CACHE_SIZE = int(os.getenv("SPECIALIST_CACHE_SIZE", "0")) or None
+
+# How often (seconds) dataset files are checked for changes
+STATS_REFRESH_SECONDS = float(os.getenv("STATS_REFRESH_SECONDS", "5"))
+
+# Live streams: readings kept per location, and how often windows are re-scored
+STREAM_WINDOW = int(os.getenv("STREAM_WINDOW", "60"))
+STREAM_FLUSH_SECONDS = float(os.getenv("STREAM_FLUSH_SECONDS", "0.25"))
+
+# Shadow mode: a registered version (e.g. SHADOW_VERSION=v3) scores a sample
+# of live batches in the background for comparison with the served models
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+SHADOW_VERSION = os.getenv("SHADOW_VERSION") or None
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "64"))
+
+# Profiling: fraction of prediction requests sampled, and the admin token that
+# forces a profile (X-Profile-Token header) and is required to read /profiles
+PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+
+profiler = Profiler(
+    ProfileStore(PROFILES_DIR, PROFILE_MAX_FILES),
+    sample_rate=PROFILE_SAMPLE_RATE,
+    interval=PROFILE_INTERVAL_MS / 1000,
+    admin_token=PROFILE_TOKEN
+)
 
 # Feature columns (must match training)
 FEATURE_COLS = [
@@ -38,16 +103,93 @@ FEATURE_COLS = [
     'CO2', 'PM2.5', 'NDVI', 'PopulationDensity'
 ]
 
+# Request parameter -> feature column
+FEATURE_MAPPING = {
+    'altitude': 'Altitude',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+    'humidity': 'Humidity',
+    'wind_speed': 'WindSpeed',
+    'co2': 'CO2',
+    'pm25': 'PM2.5',
+    'ndvi': 'NDVI',
+    'population_density': 'PopulationDensity'
+}
+
+# Per-location statistics, rebuilt only for dataset files that change
+stats_index = StatsIndex(
+    DATASETS_DIR,
+    os.path.join(MODELS_DIR, "location_stats.json"),
+    refresh_interval=STATS_REFRESH_SECONDS
+)
+stats_index.refresh(force=True)
+
+# Nearest-analog index, built by train_models.py (or here when missing or
+# stale); reloaded when the dataset files change
+analog_index = AnalogIndexFile(ANALOG_INDEX_FILE, DATASETS_DIR, refresh_interval=STATS_REFRESH_SECONDS)
+try:
+    analog_index.refresh(force=True)
+except Exception as e:
+    print(f"✗ Error loading analog index: {e}")
+
+def file_fingerprint(path):
+    """[size, mtime] of a file, or None if it does not exist"""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return [info.st_size, info.st_mtime_ns]
+
 # Load models at startup
 print("Loading models...")
 try:
+    # Taken before loading, so a file replaced meanwhile counts as changed
+    loaded_model_files = {
+        name: file_fingerprint(os.path.join(MODELS_DIR, name))
+        for name in ("oxygen_model.pkl", "people_model.pkl")
+    }
     oxygen_model = joblib.load(os.path.join(MODELS_DIR, "oxygen_model.pkl"))
     people_model = joblib.load(os.path.join(MODELS_DIR, "people_model.pkl"))
+    # Global models, used wherever no per-location specialist exists
+    router = SpecialistRouter(
+        SPECIALISTS_DIR,
+        ModelEntry(oxygen_model, "global"),
+        ModelEntry(people_model, "global"),
+        max_resident=SPECIALIST_CACHE_SIZE
+    )
     print("✓ Models loaded successfully")
+    if router.index:
+        print(f"✓ {len(router.index)} location specialists available")
 except Exception as e:
     print(f"✗ Error loading models: {e}")
     oxygen_model = None
     people_model = None
+    router = None
+
+# Registered versions, and the candidate scored in shadow mode (if any)
+registry = ModelRegistry(VERSIONS_DIR)
+try:
+    with open(os.path.join(MODELS_DIR, "model_info.json")) as f:
+        serving_version = json.load(f).get('version')
+except (OSError, ValueError):
+    serving_version = None
+
+shadow = None
+if SHADOW_VERSION and oxygen_model is not None:
+    try:
+        candidate_oxygen, candidate_people, candidate_manifest = registry.load(SHADOW_VERSION)
+        if candidate_manifest['feature_columns'] != FEATURE_COLS:
+            raise ValueError("feature columns differ from the served models")
+        shadow = ShadowScorer(
+            oxygen_model, people_model,
+            candidate_oxygen, candidate_people, candidate_manifest['version'],
+            sample_rate=SHADOW_SAMPLE_RATE,
+            queue_size=SHADOW_QUEUE_SIZE,
+            record_file=os.path.join(registry.version_dir(SHADOW_VERSION), "shadow.json")
+        ).start()
+        print(f"✓ Shadow scoring v{candidate_manifest['version']} on {SHADOW_SAMPLE_RATE:.0%} of batches")
+    except Exception as e:
+        print(f"✗ Shadow version {SHADOW_VERSION} not loaded: {e}")
 
 # Pydantic models for request/response
 class PredictionInput(BaseModel):
@@ -63,6 +205,19 @@ class PredictionInput(BaseModel):
     ndvi: Optional[float] = None
     population_density: Optional[float] = None
 
+class PredictionInterval(BaseModel):
+    """Spread of the per-tree predictions"""
+    lower: float
+    upper: float
+    std: float
+    coverage: float
+    method: str
+
+class FeatureAttribution(BaseModel):
+    """Prediction split into a baseline plus one contribution per feature"""
+    bias: float
+    contributions: dict
+
 class PredictionOutput(BaseModel):
     """Output model for predictions"""
     location: str
@@ -70,6 +225,20 @@ class PredictionOutput(BaseModel):
     predicted_number_of_people: int
     input_features: dict
     health_status: str
+    models_used: Optional[dict] = None
+    oxygen_interval: Optional[PredictionInterval] = None
+    people_interval: Optional[PredictionInterval] = None
+    oxygen_explanation: Optional[FeatureAttribution] = None
+    people_explanation: Optional[FeatureAttribution] = None
+
+class BatchPredictionInput(BaseModel):
+    """Input model for batch predictions"""
+    inputs: List[PredictionInput]
+
+class BatchPredictionOutput(BaseModel):
+    """Output model for batch predictions"""
+    count: int
+    predictions: List[PredictionOutput]
 
 class LocationInfo(BaseModel):
     """Location information"""
@@ -80,46 +249,24 @@ class LocationInfo(BaseModel):
 
 def get_available_locations():
     """Get list of available locations from datasets"""
-    csv_files = glob(os.path.join(DATASETS_DIR, "*.csv"))
-    locations = []
-    for file in csv_files:
-        name = os.path.basename(file).replace("_dataset.csv", "").replace("_dataset_updated.csv", "")
-        locations.append(name)
-    return sorted(locations)
+    stats_index.refresh()
+    return stats_index.locations()
 
 def get_location_data(location_name: str):
     """
     Get dataset for a specific location
-    Returns mean values for all features
+    Returns mean values for all features, served from the statistics index
     """
-    # Find the matching file
-    csv_files = glob(os.path.join(DATASETS_DIR, "*.csv"))
-    location_file = None
-    
-    for file in csv_files:
-        name = os.path.basename(file).replace("_dataset.csv", "").replace("_dataset_updated.csv", "")
-        if name.lower() == location_name.lower():
-            location_file = file
-            break
-    
-    if location_file is None:
+    stats_index.refresh()
+    means = stats_index.means(location_name)
+    if means is None:
         raise ValueError(f"Location '{location_name}' not found")
     
-    # Load and return mean values
-    df = pd.read_csv(location_file)
-    
     # Get mean values for features
-    location_features = {}
-    for col in FEATURE_COLS:
-        if col in df.columns:
-            location_features[col] = float(df[col].mean())
-        else:
-            location_features[col] = None
+    location_features = {col: means.get(col) for col in FEATURE_COLS}
     
     # Get default oxygen if available
-    default_oxygen = None
-    if 'Oxygen Level' in df.columns:
-        default_oxygen = float(df['Oxygen Level'].mean())
+    default_oxygen = means.get('Oxygen Level')
     
     return location_features, default_oxygen
 
@@ -145,7 +292,16 @@ async def root():
         "endpoints": {
             "locations": "/locations",
             "location_info": "/locations/{location_name}",
-            "predict": "/predict"
+            "location_stats": "/locations/{location_name}/stats",
+            "compare_locations": "/locations/compare",
+            "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "predict_locations": "/predict/locations",
+            "analogs": "/analogs",
+            "metrics": "/metrics",
+            "stream": "/ws/stream",
+            "profiles": "/profiles",
+            "models": "/models"
         }
     }
 
@@ -158,6 +314,44 @@ async def get_locations():
         "locations": locations
     }
 
+@app.get("/locations/compare")
+async def compare_locations(
+    locations: Optional[str] = None,
+    columns: str = "CO2,PM2.5,Oxygen Level"
+):
+    """
+    Compare statistics across locations side by side
+    locations and columns are comma-separated (all locations by default)
+    """
+    stats_index.refresh()
+    names = [name.strip() for name in locations.split(",")] if locations else stats_index.locations()
+    columns = [col.strip() for col in columns.split(",")]
+
+    unknown_cols = [col for col in columns if col not in STATS_COLS]
+    if unknown_cols:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown_cols)}")
+
+    comparison = {col: {} for col in columns}
+    for name in names:
+        stats = stats_index.get(name)
+        if stats is None:
+            raise HTTPException(status_code=404, detail=f"Location '{name}' not found")
+        for col in columns:
+            summary = stats['columns'].get(col)
+            comparison[col][name] = None if summary is None else {
+                key: summary[key] for key in ('count', 'mean', 'min', 'max', 'quantiles')
+            }
+    return {"locations": names, "comparison": comparison}
+
+@app.get("/locations/{location_name}/stats")
+async def get_location_stats(location_name: str):
+    """Quantiles, min/max and histograms for a location"""
+    stats_index.refresh()
+    stats = stats_index.get(location_name)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Location '{location_name}' not found")
+    return {"location": location_name, **stats}
+
 @app.get("/locations/{location_name}")
 async def get_location_details(location_name: str):
     """Get default parameters for a specific location"""
@@ -172,83 +366,499 @@ async def get_location_details(location_name: str):
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+def resolve_features(input_data: PredictionInput, location_cache: dict) -> dict:
+    """
+    Merge custom parameters with location defaults
+    location_cache avoids repeated default lookups within one request
+    """
+    key = input_data.location.lower()
+    if key not in location_cache:
+        location_cache[key] = get_location_data(input_data.location)[0]
+    location_features = location_cache[key]
+
+    # Use custom value if provided, otherwise the location default
+    feature_values = {}
+    for param, col in FEATURE_MAPPING.items():
+        value = getattr(input_data, param)
+        if value is not None:
+            feature_values[col] = value
+        elif location_features.get(col) is not None:
+            feature_values[col] = location_features[col]
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Missing required parameter: {col}. Please provide default values."
+            )
+    return feature_values
+
+def score_matrix(X, oxygen: ModelEntry, people: ModelEntry, intervals: bool,
+                 coverage: float, method: str, explain: bool) -> List[dict]:
+    """
+    Run one pair of models on a feature matrix
+    With intervals or explain, each forest is traversed once for the batch
+    and predictions, bounds and attributions all come from the leaf indices
+    """
+    if intervals or explain:
+        oxygen_leaves = oxygen.tables.leaves(X)
+        people_leaves = people.tables.leaves(X)
+
+    if intervals:
+        oxygen_band = oxygen.tables.predict_with_interval(X, coverage, method, oxygen_leaves)
+        people_band = people.tables.predict_with_interval(X, coverage, method, people_leaves)
+        predicted_oxygen, predicted_people = oxygen_band[0], people_band[0]
+    elif explain:
+        predicted_oxygen = oxygen.tables.tree_predictions(X, oxygen_leaves).mean(axis=1)
+        predicted_people = people.tables.tree_predictions(X, people_leaves).mean(axis=1)
+    else:
+        predicted_oxygen = oxygen.model.predict(X)
+        predicted_people = people.model.predict(X)
+
+    if explain:
+        oxygen_contributions = oxygen.tables.explain(X, oxygen_leaves)
+        people_contributions = people.tables.explain(X, people_leaves)
+
+    results = []
+    for i in range(len(X)):
+        result = {
+            'predicted_oxygen_level': float(predicted_oxygen[i]),
+            # Ensure people count is positive
+            'predicted_number_of_people': max(1, int(predicted_people[i])),
+            'models_used': {'oxygen': oxygen.name, 'people': people.name}
+        }
+        if intervals:
+            for name, (_, lower, upper, std) in (('oxygen_interval', oxygen_band),
+                                                 ('people_interval', people_band)):
+                result[name] = {
+                    'lower': round(float(lower[i]), 4),
+                    'upper': round(float(upper[i]), 4),
+                    'std': round(float(std[i]), 4),
+                    'coverage': coverage,
+                    'method': method
+                }
+        if explain:
+            for name, entry, contributions in (
+                ('oxygen_explanation', oxygen, oxygen_contributions),
+                ('people_explanation', people, people_contributions)
+            ):
+                result[name] = {
+                    'bias': round(entry.tables.bias, 6),
+                    'contributions': {
+                        col: round(float(value), 6)
+                        for col, value in zip(FEATURE_COLS, contributions[i])
+                    }
+                }
+        results.append(result)
+    return results
+
+def predict_features(rows: List[dict], locations: List[str], intervals: bool = False,
+                     coverage: float = 0.9, method: str = "percentile",
+                     explain: bool = False) -> List[dict]:
+    """
+    Score a list of feature dicts, routing each row by its location
+    Rows that share the same models are scored together in one pass
+    """
+    # Convert to feature array in correct order
+    X = np.array([[row[col] for col in FEATURE_COLS] for row in rows], dtype=float)
+
+    # Range-check the whole batch in one vectorized pass
+    violations = find_violations(X, FEATURE_COLS)
+    if violations:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Input values outside physical ranges", "violations": violations}
+        )
+
+    # Group rows by the (oxygen, people) models their location routes to,
+    # routing each distinct location once
+    router.refresh()
+    routes = {location: router.models_for(location) for location in set(locations)}
+    groups = {}
+    for i, location in enumerate(locations):
+        oxygen, people = routes[location]
+        groups.setdefault((id(oxygen), id(people)), (oxygen, people, []))[2].append(i)
+
+    results = [None] * len(rows)
+    for oxygen, people, indices in groups.values():
+        scored = score_matrix(X[indices], oxygen, people, intervals, coverage, method, explain)
+        for i, result in zip(indices, scored):
+            results[i] = result
+
+    if shadow is not None:
+        # Queued for the background worker, which scores it with the global
+        # and candidate models; never waits on either
+        shadow.offer(X)
+    return results
+
+def build_output(input_data: PredictionInput, feature_values: dict, result: dict,
+                 fields: Optional[set] = None) -> dict:
+    """
+    Assemble one prediction in the PredictionOutput shape
+    Plain dicts go straight to the encoder, skipping model validation
+    """
+    predicted_oxygen = result['predicted_oxygen_level']
+    return select_fields({
+        'location': input_data.location,
+        'predicted_oxygen_level': round(predicted_oxygen, 4),
+        'predicted_number_of_people': result['predicted_number_of_people'],
+        'input_features': feature_values,
+        'health_status': get_health_status(predicted_oxygen),
+        'models_used': result.get('models_used'),
+        'oxygen_interval': result.get('oxygen_interval'),
+        'people_interval': result.get('people_interval'),
+        'oxygen_explanation': result.get('oxygen_explanation'),
+        'people_explanation': result.get('people_explanation')
+    }, fields)
+
+def tag_profile(response, session):
+    """Point the client at the stored profile when the request was profiled"""
+    if session is not None and session.profile_id:
+        response.headers["X-Profile-Id"] = session.profile_id
+    return response
+
+# Last computed prediction fingerprint; /health reports it without any I/O
+latest_fingerprint = None
+
+def prediction_fingerprint() -> str:
+    """
+    Short hash of everything default-condition predictions depend on: the
+    loaded models, the specialists index and each location's dataset (the
+    source of its defaults). Changes whenever /predict/locations would.
+    Also stored as latest_fingerprint.
+    """
+    global latest_fingerprint
+    stats_index.refresh()
+    state = {
+        'model_version': serving_version,
+        'model_files': loaded_model_files if oxygen_model is not None else None,
+        'specialists': file_fingerprint(os.path.join(SPECIALISTS_DIR, 'index.json')),
+        'locations': stats_index.fingerprints()
+    }
+    latest_fingerprint = hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()[:16]
+    return latest_fingerprint
+
+def refresh_fingerprint():
+    """Keep latest_fingerprint current, checking the files every STATS_REFRESH_SECONDS"""
+    while True:
+        try:
+            prediction_fingerprint()
+        except Exception as e:
+            print(f"✗ Fingerprint refresh failed: {e}")
+        time.sleep(max(STATS_REFRESH_SECONDS, 1.0))
+
+threading.Thread(target=refresh_fingerprint, name="fingerprint-refresh", daemon=True).start()
+
+def require_models():
+    """Fail fast if the models could not be loaded"""
+    if oxygen_model is None or people_model is None:
+        raise HTTPException(
+            status_code=500, 
+            detail="Models not loaded. Please run train_models.py first."
+        )
+
 @app.post("/predict", response_model=PredictionOutput)
-async def predict(input_data: PredictionInput):
+def predict(
+    input_data: PredictionInput,
+    intervals: bool = False,
+    coverage: float = Query(0.9, gt=0.0, lt=1.0),
+    interval_method: str = Query("percentile", pattern="^(percentile|std)$"),
+    explain: bool = False,
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+    x_profile_token: Optional[str] = Header(None)
+):
     """
     Make predictions for oxygen level and number of people
+    Uses the location's specialist models when they exist
     
     You can either:
     1. Just provide location (uses default parameters)
     2. Provide location + custom parameters (overrides defaults)
+
+    Set intervals=true to also get a band across the forest's trees
+    Set explain=true to get per-feature contributions to each prediction
+    fields=a,b returns only those fields (e.g. to omit input_features)
+    Responds with MessagePack for Accept: application/msgpack
+    A valid X-Profile-Token header records a profile (see /profiles)
+
+    Defined as a plain function so inference runs in the threadpool and
+    never blocks the event loop serving /health and /locations
     """
-    if oxygen_model is None or people_model is None:
-        raise HTTPException(
-            status_code=500, 
-            detail="Models not loaded. Please run train_models.py first."
-        )
+    require_models()
     
     try:
-        # Get location defaults
-        location_features, _ = get_location_data(input_data.location)
-        
-        # Prepare feature values (use custom if provided, otherwise use defaults)
-        feature_values = {}
-        feature_mapping = {
-            'altitude': 'Altitude',
-            'pressure': 'Pressure',
-            'temperature': 'Temperature',
-            'humidity': 'Humidity',
-            'wind_speed': 'WindSpeed',
-            'co2': 'CO2',
-            'pm25': 'PM2.5',
-            'ndvi': 'NDVI',
-            'population_density': 'PopulationDensity'
-        }
-        
-        for param, col in feature_mapping.items():
-            value = getattr(input_data, param)
-            if value is not None:
-                feature_values[col] = value
-            elif location_features.get(col) is not None:
-                feature_values[col] = location_features[col]
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required parameter: {col}. Please provide default values."
-                )
-        
-        # Convert to feature array in correct order
-        X = [[feature_values[col] for col in FEATURE_COLS]]
-        
-        # Make predictions
-        predicted_oxygen = float(oxygen_model.predict(X)[0])
-        predicted_people = int(people_model.predict(X)[0])
-        
-        # Ensure people count is positive
-        predicted_people = max(1, predicted_people)
-        
-        # Get health status
-        health_status = get_health_status(predicted_oxygen)
-        
-        return PredictionOutput(
-            location=input_data.location,
-            predicted_oxygen_level=round(predicted_oxygen, 4),
-            predicted_number_of_people=predicted_people,
-            input_features=feature_values,
-            health_status=health_status
-        )
+        with profiler.session("predict", x_profile_token) as session:
+            feature_values = resolve_features(input_data, {})
+            result = predict_features(
+                [feature_values], [input_data.location], intervals, coverage, interval_method, explain
+            )[0]
+            response = render(build_output(input_data, feature_values, result, parse_fields(fields)), accept)
+        return tag_profile(response, session)
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/batch", response_model=BatchPredictionOutput)
+def predict_batch(
+    batch: BatchPredictionInput,
+    intervals: bool = False,
+    coverage: float = Query(0.9, gt=0.0, lt=1.0),
+    interval_method: str = Query("percentile", pattern="^(percentile|std)$"),
+    explain: bool = False,
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+    x_profile_token: Optional[str] = Header(None)
+):
+    """
+    Make predictions for many inputs in one call
+    All rows are scored together, so the models run once per batch
+    Accepts the same intervals/explain/fields options and Accept header as /predict
+    """
+    require_models()
+
+    try:
+        if not batch.inputs:
+            return render({'count': 0, 'predictions': []}, accept)
+
+        with profiler.session("predict_batch", x_profile_token) as session:
+            location_cache = {}
+            feature_rows = [resolve_features(item, location_cache) for item in batch.inputs]
+            results = predict_features(
+                feature_rows, [item.location for item in batch.inputs],
+                intervals, coverage, interval_method, explain
+            )
+            selected = parse_fields(fields)
+            predictions = [
+                build_output(item, features, result, selected)
+                for item, features, result in zip(batch.inputs, feature_rows, results)
+            ]
+            response = render({'count': len(predictions), 'predictions': predictions}, accept)
+        return tag_profile(response, session)
+
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@app.get("/predict/locations")
+def predict_all_locations(accept: Optional[str] = Header(None)):
+    """
+    Predictions for every location at its default conditions
+    All locations are scored in one batch. The response carries the
+    model_version and a fingerprint of the models and location data, so
+    clients can cache it until that fingerprint changes (see /health).
+    """
+    require_models()
+
+    try:
+        fingerprint = prediction_fingerprint()
+        inputs = [PredictionInput(location=name) for name in get_available_locations()]
+        location_cache = {}
+        feature_rows = [resolve_features(item, location_cache) for item in inputs]
+        results = predict_features(feature_rows, [item.location for item in inputs]) if inputs else []
+        predictions = [
+            build_output(item, features, result)
+            for item, features, result in zip(inputs, feature_rows, results)
+        ]
+        return render({
+            'model_version': serving_version,
+            'fingerprint': fingerprint,
+            'count': len(predictions),
+            'predictions': predictions
+        }, accept)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.get("/models")
+async def list_models():
+    """Registered model versions, the served version and the shadow candidate"""
+    versions = []
+    for version in registry.versions():
+        try:
+            manifest = registry.manifest(version)
+        except (OSError, ValueError, KeyError):
+            continue
+        versions.append({
+            'version': version,
+            'created': manifest['created'],
+            'oxygen_test_r2': (manifest.get('metrics_oxygen') or {}).get('test_r2'),
+            'people_test_r2': (manifest.get('metrics_people') or {}).get('test_r2'),
+            'incremental_updates': manifest.get('incremental_updates'),
+            'oxygen_sha256': manifest['artifacts']['oxygen_model.pkl']['sha256'],
+            'people_sha256': manifest['artifacts']['people_model.pkl']['sha256'],
+        })
+    return {
+        "serving_version": serving_version,
+        "shadow_version": shadow.version if shadow is not None else None,
+        "versions": versions
+    }
+
+@app.get("/models/shadow")
+async def shadow_results():
+    """Served vs candidate comparison: prediction drift and latency"""
+    if shadow is None:
+        raise HTTPException(status_code=404, detail="Shadow mode is off (set SHADOW_VERSION)")
+    return shadow.stats()
+
+@app.get("/models/{version}")
+async def get_model_manifest(version: str):
+    """Manifest of one registered version (metrics, feature columns, hashes)"""
+    try:
+        return registry.manifest(parse_version(version))
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f"Model version '{version}' not found")
+
+def require_profile_access(token):
+    """Profiles expose stack frames and file paths: only the admin token reads them"""
+    if profiler.admin_token is None:
+        raise HTTPException(status_code=404, detail="Profile access is off (set PROFILE_TOKEN)")
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+@app.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Stored request profiles, newest first"""
+    require_profile_access(x_profile_token)
+    return {
+        "sample_rate": profiler.sample_rate,
+        "max_profiles": profiler.store.max_profiles,
+        "profiles": profiler.store.list()
+    }
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """
+    One profile in collapsed-stack format
+    Feed it to flamegraph.pl or inferno, or open it in speedscope
+    """
+    require_profile_access(x_profile_token)
+    path = profiler.store.path(profile_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    return FileResponse(path, media_type="text/plain", filename=profile_id)
+
+@app.post("/analogs")
+def find_analogs(input_data: PredictionInput, k: int = Query(5, ge=1, le=100)):
+    """
+    Find the k most similar historical readings across all locations
+    Missing parameters are filled from the location defaults, as in /predict
+    """
+    try:
+        feature_values = resolve_features(input_data, {})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        analog_index.refresh()
+    except Exception as e:
+        print(f"✗ Error refreshing analog index: {e}")
+    if analog_index.index is None:
+        raise HTTPException(status_code=503, detail="Analog index not available (no readable datasets)")
+    return {
+        "location": input_data.location,
+        "query_features": feature_values,
+        "neighbors": analog_index.index.query(feature_values, k)
+    }
+
+def score_stream_windows(rows: List[dict], locations: List[str]) -> List[dict]:
+    """Score rolling-window means for the stream hub"""
+    results = predict_features(rows, locations)
+    for result in results:
+        result['health_status'] = get_health_status(result['predicted_oxygen_level'])
+    return results
+
+stream_hub = StreamHub(
+    FEATURE_COLS,
+    score_stream_windows,
+    window=STREAM_WINDOW,
+    flush_interval=STREAM_FLUSH_SECONDS
+)
+
+def parse_reading(location: str, reading: dict) -> np.ndarray:
+    """
+    Feature vector for one streamed reading
+    Accepts the /predict parameter names; missing values use location defaults
+    """
+    location_features, _ = get_location_data(location)
+    values = []
+    for param, col in FEATURE_MAPPING.items():
+        value = reading.get(param, location_features.get(col))
+        if value is None:
+            raise ValueError(f"Missing required parameter: {col}")
+        values.append(float(value))
+    row = np.array(values)
+    violations = find_violations(row[None, :], FEATURE_COLS)
+    if violations:
+        raise ValueError(f"Values outside physical ranges: {violations}")
+    return row
+
+@app.websocket("/ws/stream")
+async def stream(websocket: WebSocket):
+    """
+    Live sensor stream
+    Client messages:
+      {"action": "subscribe", "location": "ooty"}
+      {"action": "reading", "location": "ooty", "reading": {"co2": 431.0, ...}}
+    The server pushes {"type": "prediction", ...} for subscribed locations,
+    re-scored from the rolling window every STREAM_FLUSH_SECONDS
+    """
+    await websocket.accept()
+    stream_hub.start()
+    connection = stream_hub.connect(websocket)
+    sender = asyncio.create_task(connection.pump())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                action = message.get("action")
+                location = str(message.get("location", "")).lower()
+                if action == "subscribe":
+                    get_location_data(location)  # validates the name
+                    stream_hub.subscribe(connection, location)
+                    connection.send(json.dumps({"type": "subscribed", "location": location}))
+                elif action == "reading":
+                    stream_hub.push(location, parse_reading(location, message.get("reading") or {}))
+                else:
+                    raise ValueError(f"Unknown action '{action}'")
+            except (ValueError, TypeError, AttributeError) as e:
+                connection.send(json.dumps({"type": "error", "detail": str(e)}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        stream_hub.disconnect(connection)
+
+@app.get("/metrics")
+async def metrics():
+    """Admission control, live stream and profiling counters"""
+    return {
+        "admission": admission.stats(),
+        "stream": stream_hub.stats(),
+        "profiling": {"sample_rate": profiler.sample_rate, "profiled": profiler.profiled},
+        "shadow": shadow.stats() if shadow is not None else None
+    }
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """
+    Health check endpoint
+    Reads only in-memory state, so it stays fast when workers are saturated
+    """
     return {
         "status": "healthy",
-        "models_loaded": oxygen_model is not None and people_model is not None
+        "models_loaded": oxygen_model is not None and people_model is not None,
+        "model_version": serving_version,
+        "prediction_fingerprint": latest_fingerprint,
+        "specialists": router.status() if router is not None else None
     }
 
 if __name__ == "__main__":
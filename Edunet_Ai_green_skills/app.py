@@ -20,6 +20,8 @@ st.set_page_config(
 # Constants
 import os
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+# Upper bound (seconds) on how stale the location comparison can get
+COMPARISON_CACHE_SECONDS = 300
 
 # Custom CSS for better styling
 st.markdown("""
@@ -115,6 +117,193 @@ def make_prediction(location, params=None):
         st.error(f"Connection Error: {str(e)}")
         return None
 
+def render_prediction(selected_location, defaults):
+    """Prediction for the location and parameters chosen in the sidebar"""
+    if st.session_state.get('submitted', False):
+        # Show loading
+        with st.spinner('Analyzing environmental conditions and making predictions...'):
+            result = make_prediction(st.session_state.location, st.session_state.params)
+        
+        if result:
+            # Display results
+            st.success(f"✓ Predictions generated for **{result['location'].title()}**")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
+                st.markdown("### 💨 Oxygen Level")
+                st.markdown(f"# **{result['predicted_oxygen_level']:.4f}%**")
+                st.markdown("---")
+                st.markdown("**Normal Range:** 20.9% - 21.0%")
+                st.markdown("</div>", unsafe_allow_html=True)
+                
+                # Health status with color coding
+                health_status = result['health_status']
+                status_class = health_status_class(health_status)
+                
+                st.markdown(f'<div class="health-status {status_class}">🩺 {health_status}</div>', unsafe_allow_html=True)
+            
+            with col2:
+                st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
+                st.markdown("### 👥 Recommended Capacity")
+                st.markdown(f"# **{result['predicted_number_of_people']}**")
+                st.markdown("---")
+                st.markdown("**Maximum number of people**")
+                st.markdown("for optimal air quality")
+                st.markdown("</div>", unsafe_allow_html=True)
+                
+                # Info box
+                st.info(f"📍 Location: **{result['location'].title()}**")
+            
+            # Expandable details
+            with st.expander("📊 View Input Parameters", expanded=False):
+                st.json(result['input_features'])
+            
+            # Display data visually
+            st.markdown("---")
+            st.subheader("📈 Environmental Overview")
+            
+            # Create a simple chart
+            chart_data = pd.DataFrame({
+                'Parameter': ['Temperature', 'Humidity', 'Wind Speed', 'CO₂', 'PM2.5'],
+                'Value': [
+                    result['input_features'].get('Temperature', 0),
+                    result['input_features'].get('Humidity', 0),
+                    result['input_features'].get('WindSpeed', 0),
+                    result['input_features'].get('CO2', 0),
+                    result['input_features'].get('PM2.5', 0)
+                ]
+            })
+            
+            col3, col4, col5 = st.columns(3)
+            
+            with col3:
+                st.metric("Temperature", f"{result['input_features'].get('Temperature', 0):.1f} °C")
+                st.metric("Wind Speed", f"{result['input_features'].get('WindSpeed', 0):.1f} m/s")
+            
+            with col4:
+                st.metric("Humidity", f"{result['input_features'].get('Humidity', 0):.1f} %")
+                st.metric("CO₂", f"{result['input_features'].get('CO2', 0):.0f} ppm")
+            
+            with col5:
+                st.metric("PM2.5", f"{result['input_features'].get('PM2.5', 0):.1f} μg/m³")
+                st.metric("NDVI", f"{result['input_features'].get('NDVI', 0):.2f}")
+            
+    else:
+        # Welcome screen
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col2:
+            st.markdown("""
+            ### 👋 Welcome to Green Skills AI
+            
+            This application helps you predict:
+            - **Oxygen Levels** based on environmental conditions
+            - **Optimal People Capacity** for safe air quality
+            
+            #### 🚀 How to Use:
+            1. Select a location from the sidebar
+            2. Adjust environmental parameters (or use defaults)
+            3. Click **Predict** to get results
+            
+            #### 🌍 Available Locations:
+            - Ooty, Manali, Shimla, Munnar
+            - Kodaikanal, Gulmarg, Nainital
+            - Mussoorie, Chikmagalur, Ponmudi
+            - Valparai, Wagamon
+            
+            **Start by selecting a location in the sidebar →**
+            """)
+        
+        # Show default values for selected location if available
+        if defaults:
+            with st.expander(f"ℹ️ Default values for {selected_location.title()}", expanded=False):
+                st.json(defaults)
+
+def health_status_class(health_status):
+    """CSS class for a health status"""
+    for level in ("Excellent", "Good", "Fair", "Poor", "Critical"):
+        if level in health_status:
+            return f"status-{level.lower()}"
+    return ""
+
+@st.cache_data(show_spinner=False, ttl=COMPARISON_CACHE_SECONDS)
+def get_location_comparison(fingerprint):
+    """
+    Predictions for all locations at their defaults, from one API call
+    Cached per prediction fingerprint (models, specialists and location
+    data, from /health), so reruns render without a round trip
+    """
+    response = requests.get(f"{API_BASE_URL}/predict/locations", timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def render_comparison(fingerprint):
+    """Oxygen, capacity and health status of every location side by side"""
+    try:
+        comparison = get_location_comparison(fingerprint)
+    except Exception as e:
+        st.error(f"Connection Error: {str(e)}")
+        return
+    
+    if not comparison['predictions']:
+        st.info("No locations available")
+        return
+    
+    df = pd.DataFrame([{
+        'Location': p['location'].title(),
+        'Oxygen (%)': p['predicted_oxygen_level'],
+        'Capacity (people)': p['predicted_number_of_people'],
+        'Health Status': p['health_status'],
+        'CO₂ (ppm)': p['input_features'].get('CO2'),
+        'PM2.5 (μg/m³)': p['input_features'].get('PM2.5'),
+        'Temperature (°C)': p['input_features'].get('Temperature'),
+    } for p in comparison['predictions']]).sort_values('Oxygen (%)', ascending=False)
+    
+    st.subheader("📊 All Locations at Default Conditions")
+    model_version = comparison.get('model_version')
+    version = f"v{model_version}" if model_version is not None else "unversioned"
+    st.caption(f"Model {version} · {len(df)} locations scored in one server call, "
+               f"cached until the models or location data change")
+    
+    # Headline numbers
+    best = df.iloc[0]
+    largest = df.loc[df['Capacity (people)'].idxmax()]
+    normal = df['Health Status'].str.contains("Excellent|Good").sum()
+    col1, col2, col3 = st.columns(3)
+    col1.metric(f"Highest Oxygen: {best['Location']}", f"{best['Oxygen (%)']:.4f}%")
+    col2.metric(f"Largest Capacity: {largest['Location']}", f"{largest['Capacity (people)']} people")
+    col3.metric("Normal Air Quality or Better", f"{normal} of {len(df)}")
+    
+    # One card per location, four per row
+    st.markdown("---")
+    for start in range(0, len(df), 4):
+        columns = st.columns(4)
+        for column, (_, row) in zip(columns, df.iloc[start:start + 4].iterrows()):
+            with column:
+                st.markdown(f"#### 📍 {row['Location']}")
+                st.metric("💨 Oxygen", f"{row['Oxygen (%)']:.4f}%")
+                st.metric("👥 Capacity", f"{row['Capacity (people)']}")
+                st.markdown(
+                    f'<div class="health-status {health_status_class(row["Health Status"])}">'
+                    f'🩺 {row["Health Status"]}</div>',
+                    unsafe_allow_html=True
+                )
+    
+    # Charts
+    st.markdown("---")
+    col4, col5 = st.columns(2)
+    with col4:
+        st.markdown("**💨 Oxygen Level (%)**")
+        st.bar_chart(df.set_index('Location')['Oxygen (%)'])
+    with col5:
+        st.markdown("**👥 Recommended Capacity**")
+        st.bar_chart(df.set_index('Location')['Capacity (people)'])
+    
+    with st.expander("📋 Comparison Table", expanded=False):
+        st.dataframe(df, hide_index=True, use_container_width=True)
+
 def main():
     # Header
     st.markdown('<p class="main-header">🌿 Green Skills AI</p>', unsafe_allow_html=True)
@@ -223,117 +412,11 @@ def main():
             st.rerun()
     
     # Main content area
-    if st.session_state.get('submitted', False):
-        # Show loading
-        with st.spinner('Analyzing environmental conditions and making predictions...'):
-            result = make_prediction(st.session_state.location, st.session_state.params)
-        
-        if result:
-            # Display results
-            st.success(f"✓ Predictions generated for **{result['location'].title()}**")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
-                st.markdown("### 💨 Oxygen Level")
-                st.markdown(f"# **{result['predicted_oxygen_level']:.4f}%**")
-                st.markdown("---")
-                st.markdown("**Normal Range:** 20.9% - 21.0%")
-                st.markdown("</div>", unsafe_allow_html=True)
-                
-                # Health status with color coding
-                health_status = result['health_status']
-                status_class = ""
-                if "Excellent" in health_status:
-                    status_class = "status-excellent"
-                elif "Good" in health_status:
-                    status_class = "status-good"
-                elif "Fair" in health_status:
-                    status_class = "status-fair"
-                elif "Poor" in health_status:
-                    status_class = "status-poor"
-                elif "Critical" in health_status:
-                    status_class = "status-critical"
-                
-                st.markdown(f'<div class="health-status {status_class}">🩺 {health_status}</div>', unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
-                st.markdown("### 👥 Recommended Capacity")
-                st.markdown(f"# **{result['predicted_number_of_people']}**")
-                st.markdown("---")
-                st.markdown("**Maximum number of people**")
-                st.markdown("for optimal air quality")
-                st.markdown("</div>", unsafe_allow_html=True)
-                
-                # Info box
-                st.info(f"📍 Location: **{result['location'].title()}**")
-            
-            # Expandable details
-            with st.expander("📊 View Input Parameters", expanded=False):
-                st.json(result['input_features'])
-            
-            # Display data visually
-            st.markdown("---")
-            st.subheader("📈 Environmental Overview")
-            
-            # Create a simple chart
-            chart_data = pd.DataFrame({
-                'Parameter': ['Temperature', 'Humidity', 'Wind Speed', 'CO₂', 'PM2.5'],
-                'Value': [
-                    result['input_features'].get('Temperature', 0),
-                    result['input_features'].get('Humidity', 0),
-                    result['input_features'].get('WindSpeed', 0),
-                    result['input_features'].get('CO2', 0),
-                    result['input_features'].get('PM2.5', 0)
-                ]
-            })
-            
-            col3, col4, col5 = st.columns(3)
-            
-            with col3:
-                st.metric("Temperature", f"{result['input_features'].get('Temperature', 0):.1f} °C")
-                st.metric("Wind Speed", f"{result['input_features'].get('WindSpeed', 0):.1f} m/s")
-            
-            with col4:
-                st.metric("Humidity", f"{result['input_features'].get('Humidity', 0):.1f} %")
-                st.metric("CO₂", f"{result['input_features'].get('CO2', 0):.0f} ppm")
-            
-            with col5:
-                st.metric("PM2.5", f"{result['input_features'].get('PM2.5', 0):.1f} μg/m³")
-                st.metric("NDVI", f"{result['input_features'].get('NDVI', 0):.2f}")
-            
-    else:
-        # Welcome screen
-        col1, col2, col3 = st.columns([1, 2, 1])
-        
-        with col2:
-            st.markdown("""
-            ### 👋 Welcome to Green Skills AI
-            
-            This application helps you predict:
-            - **Oxygen Levels** based on environmental conditions
-            - **Optimal People Capacity** for safe air quality
-            
-            #### 🚀 How to Use:
-            1. Select a location from the sidebar
-            2. Adjust environmental parameters (or use defaults)
-            3. Click **Predict** to get results
-            
-            #### 🌍 Available Locations:
-            - Ooty, Manali, Shimla, Munnar
-            - Kodaikanal, Gulmarg, Nainital
-            - Mussoorie, Chikmagalur, Ponmudi
-            - Valparai, Wagamon
-            
-            **Start by selecting a location in the sidebar →**
-            """)
-        
-        # Show default values for selected location if available
-        if defaults:
-            with st.expander(f"ℹ️ Default values for {selected_location.title()}", expanded=False):
-                st.json(defaults)
+    tab_predict, tab_compare = st.tabs(["🔮 Predict", "📊 Compare Locations"])
+    with tab_predict:
+        render_prediction(selected_location, defaults)
+    with tab_compare:
+        render_comparison(health_data.get('prediction_fingerprint') if health_data else None)
     
     # Footer
     st.markdown("---")
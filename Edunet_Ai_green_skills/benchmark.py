@@ -0,0 +1,520 @@
+"""
+Performance benchmarks for the models and API helpers
+Run: python benchmark.py [name ...]   (no name runs all)
+"""
+
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import queue
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import joblib
+import os
+
+from analog_index import AnalogIndex, load_or_build
+from data_schema import FEATURE_COLS, SCHEMA, clean_frame, validate_values
+from forest_tables import ForestTables
+from generate_dataset import generate_corpus
+from profiling import Profiler, ProfileStore
+from shadow import ShadowScorer
+import serialization
+from stats_index import StatsIndex
+import train_models
+
+# Configuration
+DATASETS_DIR = "Datasets"
+MODELS_DIR = "models"
+
+# Dataset scales (x the current 1000 rows per location) for the scaling benchmark
+# e.g. BENCH_SCALES=10,100 python benchmark.py scaling for a quicker run
+BENCH_SCALES = [int(scale) for scale in os.getenv("BENCH_SCALES", "10,100,1000").split(",")]
+
+# Dataset scale for the training memory benchmark
+BENCH_MEMORY_SCALE = int(os.getenv("BENCH_MEMORY_SCALE", "100"))
+
+# Rows for the validation benchmark
+BENCH_VALIDATION_ROWS = int(os.getenv("BENCH_VALIDATION_ROWS", "10000000"))
+
+# Silence sklearn version warnings from the pickled models
+warnings.filterwarnings("ignore")
+
+def timed(func, repeat=20):
+    """Median wall time of func() in milliseconds"""
+    func()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+def load_feature_matrix(n_rows):
+    """Sample n_rows feature vectors from the Ooty dataset"""
+    df = pd.read_csv(os.path.join(DATASETS_DIR, "ooty_dataset_updated.csv"))
+    X = df[FEATURE_COLS].dropna().values
+    rng = np.random.default_rng(0)
+    return X[rng.integers(0, len(X), size=n_rows)]
+
+def print_header(title):
+    print(f"\n{'='*60}")
+    print(title)
+    print(f"{'='*60}")
+
+def bench_intervals():
+    """Overhead of per-tree prediction intervals over a plain predict"""
+    print_header("Prediction intervals (oxygen model)")
+    model = joblib.load(os.path.join(MODELS_DIR, "oxygen_model.pkl"))
+    tables = ForestTables(model)
+
+    def naive_loop(X):
+        per_tree = np.array([est.predict(X) for est in model.estimators_]).T
+        return np.percentile(per_tree, [5, 95], axis=1)
+
+    print(f"{'Batch':<10} {'predict ms':<14} {'vectorized ms':<16} {'tree loop ms':<14} {'overhead':<10}")
+    print(f"{'-'*60}")
+    for n_rows in (1, 100, 1000):
+        X = load_feature_matrix(n_rows)
+        base = timed(lambda: model.predict(X))
+        vectorized = timed(lambda: tables.predict_with_interval(X))
+        loop = timed(lambda: naive_loop(X))
+        overhead = (vectorized - base) / base * 100
+        print(f"{n_rows:<10} {base:<14.2f} {vectorized:<16.2f} {loop:<14.2f} {overhead:+.0f}%")
+
+def bench_explain():
+    """Per-row tree-path attributions for both models"""
+    print_header("Per-prediction feature attributions")
+    print(f"{'Model':<10} {'Build ms':<10} {'Table MB':<10} {'Batch':<7} {'predict ms':<12} {'explain ms':<12}")
+    print(f"{'-'*60}")
+    for name in ("oxygen", "people"):
+        model = joblib.load(os.path.join(MODELS_DIR, f"{name}_model.pkl"))
+        build = timed(lambda: ForestTables(model), repeat=3)
+        tables = ForestTables(model)
+        table_mb = (tables.leaf_rows.nbytes + tables.leaf_contributions.nbytes) / 1e6
+        for n_rows in (1, 1000):
+            X = load_feature_matrix(n_rows)
+            base = timed(lambda: model.predict(X))
+            explain = timed(lambda: tables.explain(X))
+            print(f"{name:<10} {build:<10.1f} {table_mb:<10.2f} {n_rows:<7} {base:<12.2f} {explain:<12.2f}")
+
+def bench_analogs():
+    """KD-tree build and k=5 query time as the number of readings grows"""
+    print_header("Nearest-analog lookup")
+    base = AnalogIndex.from_datasets(DATASETS_DIR)
+    features = base.tree.get_arrays()[0] * base.scale + base.mean
+    query = dict(zip(FEATURE_COLS, features[0]))
+    rng = np.random.default_rng(0)
+
+    print(f"{'Rows':<12} {'Build s':<12} {'Query ms':<12}")
+    print(f"{'-'*36}")
+    for factor in (1, 10, 100):
+        # Replicate the real readings with small jitter to reach the target size
+        scaled = np.repeat(features, factor, axis=0)
+        scaled += rng.normal(0, 0.01, scaled.shape) * base.scale
+        n_rows = len(scaled)
+        start = time.perf_counter()
+        index = AnalogIndex(scaled, np.zeros(n_rows), ["synthetic"], np.zeros(n_rows), np.zeros(n_rows))
+        build = time.perf_counter() - start
+        query_ms = timed(lambda: index.query(query, k=5), repeat=200)
+        print(f"{n_rows:<12} {build:<12.2f} {query_ms:<12.3f}")
+
+def _api_run(workspace, results):
+    """
+    Time the API on one generated corpus, in a fresh process whose working
+    directory holds that corpus as Datasets/ and its models in models/
+    """
+    warnings.filterwarnings("ignore")
+    import httpx
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workspace)
+
+    timings = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import api  # loads the models, stats and analog index of the corpus
+    timings['api start'] = time.perf_counter() - start
+
+    locations = api.stats_index.locations()
+    batch = {"inputs": [{"location": locations[i % len(locations)]} for i in range(1000)]}
+    query = {"location": locations[0]}
+
+    async def measure():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            requests = {
+                'api batch': lambda: client.post("/predict/batch", json=batch),
+                'api locs': lambda: client.get("/predict/locations"),
+                'api analog': lambda: client.post("/analogs", params={"k": 5}, json=query),
+            }
+            for name, request in requests.items():
+                samples = []
+                for _ in range(6):  # the first is a warm-up
+                    started = time.perf_counter()
+                    response = await request()
+                    samples.append(time.perf_counter() - started)
+                    response.raise_for_status()
+                timings[name] = float(np.median(samples[1:])) * 1000
+
+    asyncio.run(measure())
+    results.put(timings)
+
+def run_isolated(target, *args):
+    """
+    Run target(*args, results) in a fresh interpreter and return what it
+    puts on the results queue, or None if the process dies first (e.g.
+    killed for running out of memory at a large scale)
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=target, args=(*args, results))
+    process.start()
+    try:
+        while True:
+            alive = process.is_alive()
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                if not alive:
+                    print(f"✗ {target.__name__} process exited with code {process.exitcode}")
+                    return None
+    finally:
+        process.join()
+
+def bench_scaling():
+    """
+    Training and serving stages on synthetic corpora of growing size
+    The serving stages go through the API (request parsing, routing,
+    prediction and encoding) started on the generated corpus
+    """
+    print_header("Scaling on synthetic corpora (12 locations)")
+    stages = ['generate', 'load', 'prepare', 'train', 'stats', 'analogs', 'api start']
+    requests = ['api batch', 'api locs', 'api analog']
+    print(f"{'Scale':<6} {'Rows':<9} " + " ".join(f"{name:<10}" for name in stages + requests))
+    print(f"{'-'*130}")
+
+    for scale in BENCH_SCALES:
+        workspace = tempfile.mkdtemp(prefix=f"bench_x{scale}_")
+        datasets_dir = os.path.join(workspace, "Datasets")
+        models_dir = os.path.join(workspace, "models")
+        os.makedirs(models_dir)
+        timings = {}
+        try:
+            def stage(name, func):
+                start = time.perf_counter()
+                # The pipeline functions print progress; keep the table readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = func()
+                timings[name] = time.perf_counter() - start
+                return result
+
+            stage('generate', lambda: generate_corpus(datasets_dir, 12, 1000 * scale, missing_rate=0.001))
+            df = stage('load', lambda: train_models.load_all_datasets(datasets_dir))
+            n_rows = len(df)
+            X, y_oxygen, _ = stage('prepare', lambda: train_models.prepare_data(df))
+            del df
+            model, _ = stage('train', lambda: train_models.train_and_evaluate_model(X, y_oxygen, "oxygen"))
+            del X, y_oxygen
+            stage('stats', lambda: StatsIndex(
+                datasets_dir, os.path.join(models_dir, "location_stats.json")).refresh())
+            stage('analogs', lambda: load_or_build(
+                os.path.join(models_dir, "analog_index.pkl"), datasets_dir))
+
+            # The API needs both models; serving the oxygen forest for both
+            # targets measures the same cost without a second fit
+            for name in ("oxygen_model.pkl", "people_model.pkl"):
+                joblib.dump(model, os.path.join(models_dir, name))
+            del model
+            api_timings = run_isolated(_api_run, workspace)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+        if api_timings is None:
+            print(f"{scale:<6} {n_rows:<9} API run failed")
+            continue
+        timings.update(api_timings)
+        print(f"{scale:<6} {n_rows:<9} " + " ".join(f"{timings[s]:<10.2f}" for s in stages)
+              + " " + " ".join(f"{timings[r]:<10.1f}" for r in requests))
+    print("Stages in seconds. Requests in ms, median of 5: POST /predict/batch with 1000")
+    print("inputs, GET /predict/locations, POST /analogs (k=5).")
+
+def _copying_pipeline(datasets_dir, stages):
+    """
+    The training pipeline before float32 storage and index-based splits:
+    one float64 frame of every file, train_test_split copies and metrics
+    from full-length predictions
+    """
+    from glob import glob
+    from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+    from sklearn.model_selection import train_test_split
+
+    columns = FEATURE_COLS + [train_models.TARGET_OXYGEN, train_models.TARGET_PEOPLE]
+    frames = []
+    for file in glob(os.path.join(datasets_dir, "*.csv")):
+        df = pd.read_csv(file)
+        df['Location'] = train_models.location_name_from_file(file)
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    del frames
+    df, _ = clean_frame(df, columns)
+    df = df.reindex(columns=columns)
+    X = df[FEATURE_COLS].values
+    y_oxygen = df[train_models.TARGET_OXYGEN].values
+    del df
+    train_models.report_memory("load + validate", stages)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y_oxygen, test_size=train_models.TEST_SIZE, random_state=train_models.RANDOM_STATE
+    )
+    model = train_models.new_forest()
+    model.fit(X_train, y_train)
+    for X_split, y_split in ((X_train, y_train), (X_test, y_test)):
+        predictions = model.predict(X_split)
+        r2_score(y_split, predictions)
+        mean_absolute_error(y_split, predictions)
+        np.sqrt(mean_squared_error(y_split, predictions))
+
+def _memory_run(mode, datasets_dir, results):
+    """One training pipeline in a fresh process, recording peak RSS per stage"""
+    warnings.filterwarnings("ignore")
+    stages = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_models.report_memory("start", stages)
+        if mode == "float64 + copies":
+            _copying_pipeline(datasets_dir, stages)
+        else:
+            X, y_oxygen, _, n_train = train_models.load_training_arrays(datasets_dir)
+            train_models.report_memory("load + validate", stages)
+            train_models.train_and_evaluate_model(X, y_oxygen, "oxygen", n_train=n_train)
+        train_models.report_memory("oxygen model", stages)
+    results.put(stages)
+
+def bench_memory():
+    """Peak RSS per training stage, float64 copies vs the lean pipeline"""
+    if train_models.resource is None:
+        print("Peak RSS is not available on this platform")
+        return
+    print_header(f"Training memory at {BENCH_MEMORY_SCALE}x the current data (peak RSS, MB)")
+    out_dir = tempfile.mkdtemp(prefix=f"bench_mem_x{BENCH_MEMORY_SCALE}_")
+    try:
+        generate_corpus(out_dir, 12, 1000 * BENCH_MEMORY_SCALE, missing_rate=0.001)
+        # Fresh interpreter per pipeline so peaks do not carry over
+        stages = ["start", "load + validate", "oxygen model"]
+        print(f"{'Pipeline':<20} " + " ".join(f"{stage:<16}" for stage in stages))
+        print(f"{'-'*70}")
+        for mode in ("float64 + copies", "float32 + views"):
+            peaks = run_isolated(_memory_run, mode, out_dir)
+            if peaks is None:
+                print(f"{mode:<20} failed")
+                continue
+            print(f"{mode:<20} " + " ".join(f"{peaks[stage]:<16,.0f}" for stage in stages))
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+def bench_validation():
+    """Schema validation and cleaning compared with the old dropna-only step"""
+    n_rows = BENCH_VALIDATION_ROWS
+    columns = list(SCHEMA)
+    print_header(f"Validation and cleaning ({n_rows:,} rows x {len(columns)} columns)")
+
+    # Readings inside the schema ranges, with 0.1% missing and 0.1% out of range
+    rng = np.random.default_rng(0)
+    lower = np.array([SCHEMA[col]['min'] for col in columns])
+    upper = np.array([SCHEMA[col]['max'] for col in columns])
+    values = lower + rng.random((n_rows, len(columns))) * (upper - lower)
+    values[:, columns.index('Number of People')] = np.round(values[:, columns.index('Number of People')])
+    bad = rng.random((n_rows, len(columns)))
+    values[bad < 0.001] = np.nan
+    values[(bad >= 0.001) & (bad < 0.002)] = -1e9
+    df = pd.DataFrame(values, columns=columns)
+    del values, bad
+
+    def run(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    dropna = run(lambda: df.dropna(subset=columns))
+    validate = run(lambda: validate_values(df.to_numpy(), columns))
+    clean = run(lambda: clean_frame(df, columns))
+    print(f"{'dropna only (previous)':<32} {dropna:.2f} s")
+    print(f"{'schema validation':<32} {validate:.2f} s")
+    print(f"{'validation + duplicate removal':<32} {clean:.2f} s")
+
+    X = df[columns[:9]].to_numpy()[:1000]
+    print(f"{'API batch check (1000 rows)':<32} {timed(lambda: validate_values(X, columns[:9])):.3f} ms")
+
+def bench_serialization():
+    """Encode time and size of prediction responses per format"""
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from api import PredictionOutput, BatchPredictionOutput  # loads the models
+
+    print_header("Response serialization")
+    X = load_feature_matrix(1000)
+    predictions = [{
+        'location': 'ooty',
+        'predicted_oxygen_level': 20.9924,
+        'predicted_number_of_people': 385,
+        'input_features': {col: float(value) for col, value in zip(FEATURE_COLS, row)},
+        'health_status': 'Good - Normal air quality',
+        'models_used': {'oxygen': 'global', 'people': 'global'},
+    } for row in X]
+    lean = [serialization.select_fields(p, {'predicted_oxygen_level', 'predicted_number_of_people',
+                                            'health_status'}) for p in predictions]
+
+    # The path the endpoints used before: FastAPI validates the payload
+    # against response_model, serializes it to Python objects and JSONResponse
+    # encodes those with the standard library
+    adapters = {'batch': TypeAdapter(BatchPredictionOutput), 'single': TypeAdapter(PredictionOutput)}
+    def response_model(payload):
+        adapter = adapters['batch' if 'predictions' in payload else 'single']
+        content = adapter.dump_python(adapter.validate_python(payload), mode="json")
+        return JSONResponse(content).body
+
+    encoders = {
+        'response_model': response_model,
+        'pydantic fallback': serialization.encode_json_fallback,
+    }
+    if serialization.orjson is not None:
+        encoders['orjson'] = serialization.encode_json
+    if serialization.msgpack is not None:
+        encoders['msgpack'] = serialization.encode_msgpack
+
+    cases = {
+        'single': predictions[0],
+        'single, no inputs': lean[0],
+        'batch 1000': {'count': 1000, 'predictions': predictions},
+        'batch 1000, no inputs': {'count': 1000, 'predictions': lean},
+    }
+    print(f"{'Payload':<24} {'Encoder':<16} {'Encode ms':<12} {'Bytes':<10}")
+    print(f"{'-'*62}")
+    for case, payload in cases.items():
+        for name, encode in encoders.items():
+            if name == 'response_model' and 'no inputs' in case:
+                continue  # the response model requires every field
+            encode_ms = timed(lambda: encode(payload))
+            print(f"{case:<24} {name:<16} {encode_ms:<12.3f} {len(encode(payload)):<10}")
+
+def bench_admission():
+    """Traffic spike against /predict/batch with /health probes alongside"""
+    import httpx
+    import api
+    from admission import AdmissionController
+
+    print_header("Admission control under a spike (200 batch requests)")
+    payload = {"inputs": [{"location": "ooty", "co2": 400.0 + i % 50} for i in range(200)]}
+
+    async def spike():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def probe():
+                await asyncio.sleep(0.05)
+                start = time.perf_counter()
+                await client.get("/health")
+                return (time.perf_counter() - start) * 1000
+
+            async def request():
+                start = time.perf_counter()
+                response = await client.post("/predict/batch", json=payload)
+                return response.status_code, (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            responses, probes = await asyncio.gather(
+                asyncio.gather(*[request() for _ in range(200)]),
+                asyncio.gather(*[probe() for _ in range(20)])
+            )
+            elapsed = time.perf_counter() - start
+        statuses = [status for status, _ in responses]
+        admitted_ms = [ms for status, ms in responses if status == 200]
+        return statuses, admitted_ms, probes, elapsed
+
+    print(f"{'Mode':<28} {'200':<6} {'429':<6} {'503':<6} {'Total s':<9} "
+          f"{'200 p99 ms':<12} {'/health p99 ms':<15}")
+    print(f"{'-'*84}")
+    for mode, controller in (
+        ("unlimited", AdmissionController(max_in_flight=10_000, max_queue=0)),
+        ("4 in flight, queue 16, 1s", AdmissionController(max_in_flight=4, max_queue=16, queue_timeout=1.0)),
+    ):
+        api.admission.__dict__.update(controller.__dict__)
+        statuses, admitted_ms, probes, elapsed = asyncio.run(spike())
+        print(f"{mode:<28} {statuses.count(200):<6} {statuses.count(429):<6} {statuses.count(503):<6} "
+              f"{elapsed:<9.2f} {np.percentile(admitted_ms, 99):<12.0f} {np.percentile(probes, 99):<15.1f}")
+    print(f"Counters: {api.admission.stats()}")
+
+def bench_profiling():
+    """Cost of the profiling hook on unsampled and profiled predictions"""
+    from api import predict_features
+
+    print_header("Profiling overhead (batch of 100 predictions)")
+    X = load_feature_matrix(100)
+    rows = [dict(zip(FEATURE_COLS, row)) for row in X]
+    locations = ['ooty'] * len(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        off = Profiler(ProfileStore(tmp), sample_rate=0.0)
+        on = Profiler(ProfileStore(tmp, max_profiles=5), sample_rate=1.0, interval=0.001)
+
+        def hooked(profiler):
+            def run():
+                with profiler.session("bench"):
+                    predict_features(rows, locations)
+            return run
+
+        print(f"{'Mode':<28} {'ms/request':<12}")
+        print(f"{'-'*40}")
+        print(f"{'no hook':<28} {timed(lambda: predict_features(rows, locations)):<12.3f}")
+        print(f"{'hook, not sampled':<28} {timed(hooked(off)):<12.3f}")
+        print(f"{'hook, profiled (1 ms)':<28} {timed(hooked(on)):<12.3f}")
+        print(f"Unsampled hook alone: {timed(lambda: off.session('bench'), repeat=10000) * 1000:.2f} µs")
+
+def bench_shadow():
+    """Request latency with shadow scoring off and on (candidate = served models)"""
+    import api
+
+    print_header("Shadow scoring (batch of 100 predictions)")
+    X = load_feature_matrix(100)
+    rows = [dict(zip(FEATURE_COLS, row)) for row in X]
+    locations = ['ooty'] * len(rows)
+    run = lambda: api.predict_features(rows, locations)
+
+    print(f"{'Mode':<28} {'ms/request':<12}")
+    print(f"{'-'*40}")
+    api.shadow = None
+    print(f"{'shadow off':<28} {timed(run, repeat=50):<12.3f}")
+    for rate in (0.1, 1.0):
+        api.shadow = ShadowScorer(api.oxygen_model, api.people_model,
+                                  api.oxygen_model, api.people_model, 'bench',
+                                  sample_rate=rate, queue_size=64).start()
+        print(f"{f'shadow on, {rate:.0%} sampled':<28} {timed(run, repeat=50):<12.3f}")
+        api.shadow.wait_idle()
+        stats = api.shadow.stats()
+        print(f"  scored {stats['batches_scored']}, dropped {stats['batches_dropped']}, "
+              f"oxygen MAE {stats['oxygen'].get('mae', 0):.6f}")
+    api.shadow = None
+
+BENCHMARKS = {
+    'intervals': bench_intervals,
+    'explain': bench_explain,
+    'analogs': bench_analogs,
+    'scaling': bench_scaling,
+    'validation': bench_validation,
+    'serialization': bench_serialization,
+    'admission': bench_admission,
+    'profiling': bench_profiling,
+    'shadow': bench_shadow,
+    'memory': bench_memory,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
@@ -0,0 +1,305 @@
+"""
+K-fold cross-validation of the training pipeline
+Folds are fitted in parallel across processes. Out-of-fold predictions
+are cached on disk (keyed by the datasets, features, hyperparameters and
+fold setup), so asking for different metrics later reuses them instead
+of refitting. Writes models/cv_report.json with overall, per-fold and
+per-location errors, residual quantiles and timing per fold.
+
+Run: python cross_validate.py [--folds K] [--split auto|location|kfold]
+                              [--metrics r2,mae,rmse] [--workers N] [--no-cache]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GroupKFold, KFold
+
+from data_schema import SCHEMA, clean_frame
+from train_models import (
+    CACHE_DIR, DATASETS_DIR, FEATURE_COLS, MODELS_DIR, MODEL_PARAMS, PIPELINE_VERSION,
+    RANDOM_STATE, TARGET_OXYGEN, TARGET_PEOPLE, dataset_digests, fit_in_worker, load_all_datasets
+)
+
+# Configuration
+CV_CACHE_DIR = os.path.join(CACHE_DIR, "cv")
+REPORT_FILE = os.path.join(MODELS_DIR, "cv_report.json")
+DEFAULT_FOLDS = 5
+
+TARGETS = {'oxygen': TARGET_OXYGEN, 'people': TARGET_PEOPLE}
+RESIDUAL_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Metric name -> function(y_true, y_pred); new ones work on cached predictions
+METRICS = {
+    'r2': lambda y, p: float(r2_score(y, p)) if len(y) > 1 else None,
+    'mae': lambda y, p: float(np.mean(np.abs(p - y))),
+    'rmse': lambda y, p: float(np.sqrt(np.mean((p - y) ** 2))),
+    'medae': lambda y, p: float(np.median(np.abs(p - y))),
+    'bias': lambda y, p: float(np.mean(p - y)),
+    'mape': lambda y, p: float(np.mean(np.abs(p - y) / np.maximum(np.abs(y), 1e-9)) * 100),
+}
+DEFAULT_METRICS = ['r2', 'mae', 'rmse']
+
+def load_cv_data(datasets_dir=DATASETS_DIR):
+    """
+    The rows of each target, cleaned on the features and that target only
+    (as for the specialists), so a location missing one target still
+    counts for the other
+    Returns {label: (X, y, location per row)}
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = load_all_datasets(datasets_dir)
+    data = {}
+    for label, target in TARGETS.items():
+        columns = FEATURE_COLS + [target]
+        rows, _ = clean_frame(df.reindex(columns=columns + ['Location']), columns)
+        data[label] = (
+            rows[FEATURE_COLS].to_numpy(dtype=np.float32),
+            rows[target].to_numpy(dtype=float),
+            rows['Location'].to_numpy(dtype=str)
+        )
+    return data
+
+def assign_folds(locations, folds, split):
+    """
+    Fold number of every row, and the split actually used
+    'location' holds out whole locations (GroupKFold) and 'kfold' shuffles
+    rows. With 'auto' or 'location', rows from fewer than `folds`
+    locations fall back to 'kfold'.
+    """
+    n_locations = len(set(locations))
+    if split in ('auto', 'location'):
+        split = 'location' if n_locations >= folds else 'kfold'
+    if split == 'location':
+        splits = GroupKFold(n_splits=folds).split(locations, groups=locations)
+    else:
+        splits = KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(locations)
+
+    fold_of = np.empty(len(locations), dtype=int)
+    for fold, (_, test_idx) in enumerate(splits):
+        fold_of[test_idx] = fold
+    return fold_of, split
+
+def cv_key(digests, folds, split):
+    """Hash of everything that determines the out-of-fold predictions"""
+    config = {
+        'datasets': sorted(digests.values()),
+        'schema': SCHEMA,
+        'pipeline_version': PIPELINE_VERSION,
+        'feature_columns': FEATURE_COLS,
+        'targets': list(TARGETS.values()),
+        'cleaning': 'per-target',
+        'model_params': MODEL_PARAMS,
+        'random_state': RANDOM_STATE,
+        'folds': folds,
+        'split': split,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+def _fit_fold(label, fold, X_train, y_train, X_test):
+    """Fit one fold and predict its held-out rows (runs in a worker process)"""
+    start = time.perf_counter()
+    model = fit_in_worker(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = model.predict(X_test)
+    return label, fold, predictions, fit_seconds, time.perf_counter() - start
+
+def run_folds(data, fold_of, folds, max_workers=None):
+    """
+    Out-of-fold predictions for every target, all folds in parallel
+    data is {label: (X, y, locations)} and fold_of {label: fold per row}
+    Returns ({label: predictions}, [timing per fold and target])
+    """
+    predictions = {label: np.empty(len(y)) for label, (_, y, _) in data.items()}
+    timings = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = []
+        for label, (X, y, _) in data.items():
+            for fold in range(folds):
+                test = fold_of[label] == fold
+                futures.append(pool.submit(_fit_fold, label, fold, X[~test], y[~test], X[test]))
+        for future in futures:
+            label, fold, fold_predictions, fit_seconds, predict_seconds = future.result()
+            predictions[label][fold_of[label] == fold] = fold_predictions
+            timings.append({
+                'target': label,
+                'fold': fold,
+                'fit_seconds': round(fit_seconds, 4),
+                'predict_seconds': round(predict_seconds, 4),
+            })
+            print(f"  ✓ {label} fold {fold + 1}/{folds}: fit {fit_seconds:.2f}s")
+    return predictions, timings
+
+def cross_validate(folds=DEFAULT_FOLDS, split='auto', max_workers=None, use_cache=True):
+    """
+    Out-of-fold predictions, from the cache when nothing changed
+    Returns the cached run: targets, predictions, folds, locations, timings
+    """
+    key = cv_key(dataset_digests(DATASETS_DIR), folds, split)
+    arrays_file = os.path.join(CV_CACHE_DIR, f"{key}.npz")
+    info_file = os.path.join(CV_CACHE_DIR, f"{key}.json")
+
+    if use_cache and os.path.exists(arrays_file) and os.path.exists(info_file):
+        with np.load(arrays_file) as arrays:
+            run = {name: arrays[name] for name in arrays.files}
+        with open(info_file) as f:
+            run.update(json.load(f))
+        run['cached'] = True
+        print(f"✓ Reused cached out-of-fold predictions (key {key[:12]})")
+        return run
+
+    data = load_cv_data()
+    fold_of, split_used = {}, {}
+    for label, (_, y, locations) in data.items():
+        if len(y) < folds:
+            raise ValueError(f"{label}: {len(y)} rows cannot make {folds} folds")
+        fold_of[label], split_used[label] = assign_folds(locations, folds, split)
+        note = ""
+        if split == 'location' and split_used[label] != 'location':
+            note = f" (only {len(set(locations))} locations)"
+        print(f"Cross-validating {label}: {len(y)} rows, {folds} folds, {split_used[label]} split{note}")
+    if split == 'location' and 'location' not in split_used.values():
+        raise ValueError(f"No target has rows from {folds} locations to make location folds")
+
+    start = time.perf_counter()
+    predictions, timings = run_folds(data, fold_of, folds, max_workers)
+    wall_seconds = time.perf_counter() - start
+
+    run = {}
+    for label, (_, y, locations) in data.items():
+        run[f'y_{label}'] = y
+        run[f'oof_{label}'] = predictions[label]
+        run[f'fold_{label}'] = fold_of[label]
+        run[f'location_{label}'] = locations
+    info = {
+        'key': key,
+        'folds': folds,
+        'split': split_used,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'wall_seconds': round(wall_seconds, 3),
+        'timings': timings,
+    }
+    os.makedirs(CV_CACHE_DIR, exist_ok=True)
+    np.savez_compressed(arrays_file, **run)
+    with open(info_file, 'w') as f:
+        json.dump(info, f, indent=2)
+
+    run.update(info)
+    run['cached'] = False
+    return run
+
+def score(y, predictions, metrics):
+    return {name: METRICS[name](y, predictions) for name in metrics}
+
+def residual_quantiles(y, predictions):
+    residuals = predictions - y
+    return {f"q{int(q * 100):02d}": float(np.quantile(residuals, q)) for q in RESIDUAL_QUANTILES}
+
+def build_report(run, metrics):
+    """Overall, per-fold and per-location errors from out-of-fold predictions"""
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'cache_key': run['key'],
+        'reused_cached_predictions': run['cached'],
+        'folds': run['folds'],
+        'metrics': metrics,
+        'wall_seconds': run['wall_seconds'],
+        'targets': {},
+    }
+    for label in TARGETS:
+        y, predictions = run[f'y_{label}'], run[f'oof_{label}']
+        fold_of, locations = run[f'fold_{label}'], run[f'location_{label}']
+        timing = {t['fold']: t for t in run['timings'] if t['target'] == label}
+
+        fold_rows = []
+        for fold in range(run['folds']):
+            held_out = fold_of == fold
+            fold_rows.append({
+                'fold': fold,
+                'test_rows': int(held_out.sum()),
+                'fit_seconds': timing[fold]['fit_seconds'],
+                'predict_seconds': timing[fold]['predict_seconds'],
+                **score(y[held_out], predictions[held_out], metrics)
+            })
+
+        by_location = {}
+        for location in sorted(set(locations)):
+            rows = locations == location
+            by_location[location] = {
+                'rows': int(rows.sum()),
+                **score(y[rows], predictions[rows], metrics),
+                'residual_quantiles': residual_quantiles(y[rows], predictions[rows])
+            }
+
+        fold_values = {
+            name: [row[name] for row in fold_rows if row[name] is not None] for name in metrics
+        }
+        report['targets'][label] = {
+            'split': run['split'][label],
+            'rows': int(len(y)),
+            'overall': score(y, predictions, metrics),
+            'fold_mean': {name: float(np.mean(v)) if v else None for name, v in fold_values.items()},
+            'fold_std': {name: float(np.std(v)) if v else None for name, v in fold_values.items()},
+            'residual_quantiles': residual_quantiles(y, predictions),
+            'folds': fold_rows,
+            'locations': by_location,
+        }
+    return report
+
+def print_summary(report):
+    print(f"\n{'='*60}")
+    print(f"CROSS-VALIDATION ({report['folds']} folds)")
+    print(f"{'='*60}")
+    for label, result in report['targets'].items():
+        print(f"{label}: {result['rows']} rows from {len(result['locations'])} locations, {result['split']} split")
+    print(f"{'Target':<10} {'Metric':<8} {'Overall':<12} {'Fold mean':<12} {'Fold std':<12}")
+    print(f"{'-'*60}")
+    for label, result in report['targets'].items():
+        for name in report['metrics']:
+            values = [result['overall'][name], result['fold_mean'][name], result['fold_std'][name]]
+            cells = " ".join(f"{'-' if v is None else f'{v:.4f}':<12}" for v in values)
+            print(f"{label:<10} {name:<8} {cells}")
+    fits = [row['fit_seconds'] for result in report['targets'].values() for row in result['folds']]
+    print(f"\nFold fits: {sum(fits):.1f}s total, {report['wall_seconds']:.1f}s wall")
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate the training pipeline")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="number of folds")
+    parser.add_argument("--split", choices=["auto", "location", "kfold"], default="auto",
+                        help="hold out whole locations, or shuffled rows")
+    parser.add_argument("--metrics", default=",".join(DEFAULT_METRICS),
+                        help=f"comma-separated, from: {', '.join(METRICS)}")
+    parser.add_argument("--workers", type=int, default=None, help="parallel fold processes")
+    parser.add_argument("--no-cache", action="store_true", help="refit even if predictions are cached")
+    args = parser.parse_args()
+
+    metrics = [name.strip() for name in args.metrics.split(",") if name.strip()]
+    unknown = [name for name in metrics if name not in METRICS]
+    if unknown:
+        parser.error(f"unknown metrics: {', '.join(unknown)}")
+
+    try:
+        run = cross_validate(args.folds, args.split, args.workers, use_cache=not args.no_cache)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    report = build_report(run, metrics)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    with open(REPORT_FILE, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"✓ Report written to '{REPORT_FILE}'")
+
+if __name__ == "__main__":
+    main()
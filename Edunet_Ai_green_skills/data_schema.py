@@ -0,0 +1,133 @@
+"""
+Declarative schema for sensor readings
+Physical ranges and types for every feature and target, applied as one
+vectorized pass: to whole dataframes during training, and to feature
+matrices for API batches.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Allowed range (inclusive) and type per column
+SCHEMA = {
+    'Altitude':          {'min': -500.0, 'max': 9000.0},    # m
+    'Pressure':          {'min': 300.0,  'max': 1100.0},    # hPa
+    'Temperature':       {'min': -60.0,  'max': 60.0},      # °C
+    'Humidity':          {'min': 0.0,    'max': 100.0},     # %
+    'WindSpeed':         {'min': 0.0,    'max': 120.0},     # m/s
+    'CO2':               {'min': 250.0,  'max': 5000.0},    # ppm
+    'PM2.5':             {'min': 0.0,    'max': 1000.0},    # μg/m³
+    'NDVI':              {'min': -1.0,   'max': 1.0},
+    'PopulationDensity': {'min': 0.0,    'max': 100000.0},  # people/km²
+    'Oxygen Level':      {'min': 0.0,    'max': 100.0},     # %
+    'Number of People':  {'min': 0.0,    'max': 1000000.0, 'integer': True},
+}
+
+# Model inputs, in training order
+FEATURE_COLS = [
+    'Altitude', 'Pressure', 'Temperature', 'Humidity', 'WindSpeed',
+    'CO2', 'PM2.5', 'NDVI', 'PopulationDensity'
+]
+
+# Target columns
+TARGET_OXYGEN = 'Oxygen Level'
+TARGET_PEOPLE = 'Number of People'
+
+RULES = ['missing', 'below_min', 'above_max', 'not_integer']
+
+def _rule_masks(values, columns):
+    """
+    Boolean violation masks, each of shape (n_rows, n_columns)
+    All columns are checked at once against broadcast bounds
+    """
+    lower = np.array([SCHEMA[col]['min'] for col in columns])
+    upper = np.array([SCHEMA[col]['max'] for col in columns])
+    integer = np.array([SCHEMA[col].get('integer', False) for col in columns])
+
+    missing = np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        masks = {
+            'missing': missing,
+            'below_min': values < lower,
+            'above_max': values > upper,
+            'not_integer': integer & ~missing & (values != np.round(values)),
+        }
+    return masks
+
+def validate_values(values, columns):
+    """
+    Check a float matrix against the schema
+    Returns (valid row mask, {rule: {column: count}})
+    """
+    values = np.asarray(values, dtype=float)
+    masks = _rule_masks(values, columns)
+    invalid = np.zeros(len(values), dtype=bool)
+    counts = {}
+    for rule in RULES:
+        per_column = masks[rule].sum(axis=0)
+        counts[rule] = {col: int(n) for col, n in zip(columns, per_column) if n}
+        invalid |= masks[rule].any(axis=1)
+    return ~invalid, counts
+
+def find_violations(values, columns, limit=20):
+    """
+    First violations in a float matrix, for API error messages
+    Returns a list of {row, column, value, rule}
+    """
+    values = np.asarray(values, dtype=float)
+    masks = _rule_masks(values, columns)
+    violations = []
+    for rule in RULES:
+        for row, j in zip(*np.nonzero(masks[rule])):
+            value = values[row, j]
+            violations.append({
+                'row': int(row),
+                'column': columns[j],
+                'value': None if np.isnan(value) else float(value),
+                'rule': rule,
+                'allowed': [SCHEMA[columns[j]]['min'], SCHEMA[columns[j]]['max']]
+            })
+            if len(violations) >= limit:
+                return violations
+    return violations
+
+def clean_frame(df, columns, drop_duplicates=True):
+    """
+    Drop rows that violate the schema in any of columns, then duplicates
+    Duplicates also take the Location column into account when present,
+    and are found by a 64-bit hash per row rather than comparing columns
+    Returns (cleaned dataframe, summary report)
+    """
+    # Absent columns count as missing in every row
+    values = df.reindex(columns=columns).to_numpy(dtype=float, na_value=np.nan)
+    valid, counts = validate_values(values, columns)
+    cleaned = df[valid]
+
+    duplicates = 0
+    if drop_duplicates and len(cleaned):
+        subset = columns + (['Location'] if 'Location' in cleaned.columns else [])
+        row_hashes = pd.util.hash_pandas_object(cleaned[subset], index=False)
+        duplicated = row_hashes.duplicated().to_numpy()
+        duplicates = int(duplicated.sum())
+        if duplicates:
+            cleaned = cleaned[~duplicated]
+
+    report = {
+        'input_rows': int(len(df)),
+        'invalid_rows': int((~valid).sum()),
+        'duplicate_rows': duplicates,
+        'output_rows': int(len(cleaned)),
+        'violations': counts
+    }
+    return cleaned, report
+
+def format_report(report):
+    """Readable multi-line summary of a clean_frame report"""
+    lines = [
+        f"Rows in: {report['input_rows']}, invalid: {report['invalid_rows']}, "
+        f"duplicates: {report['duplicate_rows']}, kept: {report['output_rows']}"
+    ]
+    for rule, by_column in report['violations'].items():
+        for col, count in by_column.items():
+            lines.append(f"  {rule:<12} {col:<20} {count}")
+    return "\n".join(lines)
@@ -0,0 +1,15 @@
+"""
+Content hashes of files
+Used to key the training cache on the datasets, to record which datasets
+an analog index was built from, and to verify registered model artifacts.
+"""
+
+import hashlib
+
+def file_digest(path):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,116 @@
+"""
+Vectorized queries over fitted RandomForest models
+Flattens every tree's node values into one padded table so per-tree
+outputs for a whole batch come from a single gather instead of a
+Python loop over model.estimators_
+
+Per-feature attributions use the tree-path decomposition: each split on
+the way to a leaf moves the prediction from the parent's value to the
+child's, and that change is credited to the split feature. Summing the
+changes per leaf once at load time turns explanation into another gather.
+"""
+
+from statistics import NormalDist
+import numpy as np
+
+
+class ForestTables:
+    """Padded per-tree node tables for a fitted RandomForestRegressor"""
+
+    def __init__(self, model):
+        self.model = model
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        self.n_trees = len(trees)
+        self.max_nodes = max(tree.node_count for tree in trees)
+
+        # node_values[t, node] = mean target of that node in tree t
+        self.node_values = np.zeros((self.n_trees, self.max_nodes))
+        for i, tree in enumerate(trees):
+            self.node_values[i, :tree.node_count] = tree.value[:, 0, 0]
+
+        # Offsets into the flattened table, one per tree
+        self._offsets = np.arange(self.n_trees) * self.max_nodes
+
+        # leaf_contributions[leaf_rows[t * max_nodes + node], f] = change
+        # credited to feature f on the path from the root of tree t down to
+        # that leaf. explain() only ever gathers leaves, so internal nodes
+        # get no row (-1) and the rows are float32 to keep large forests small
+        self.n_features = model.n_features_in_
+        self.leaf_rows = np.full(self.n_trees * self.max_nodes, -1, dtype=np.int32)
+        leaf_tables = []
+        n_leaves = 0
+        for i, tree in enumerate(trees):
+            leaves = np.flatnonzero(tree.children_left < 0)
+            self.leaf_rows[self._offsets[i] + leaves] = np.arange(n_leaves, n_leaves + leaves.size)
+            leaf_tables.append(self._path_contributions(tree)[leaves].astype(np.float32))
+            n_leaves += leaves.size
+        self.leaf_contributions = np.concatenate(leaf_tables)
+
+        # Prediction before any split: mean of the root values
+        self.bias = float(self.node_values[:, 0].mean())
+
+    @staticmethod
+    def _path_contributions(tree):
+        """Accumulate split contributions level by level for one tree"""
+        n_nodes = tree.node_count
+        values = tree.value[:, 0, 0]
+        contributions = np.zeros((n_nodes, tree.n_features))
+
+        # Parent of every node (root has none)
+        parent = np.full(n_nodes, -1)
+        internal = np.flatnonzero(tree.children_left >= 0)
+        parent[tree.children_left[internal]] = internal
+        parent[tree.children_right[internal]] = internal
+
+        # Walk down one depth level at a time, all nodes of a level at once
+        level = np.array([tree.children_left[0], tree.children_right[0]])
+        level = level[level >= 0]
+        while level.size:
+            parents = parent[level]
+            contributions[level] = contributions[parents]
+            contributions[level, tree.feature[parents]] += values[level] - values[parents]
+            children = np.concatenate([tree.children_left[level], tree.children_right[level]])
+            level = children[children >= 0]
+
+        return contributions
+
+    def leaves(self, X):
+        """Leaf index reached in every tree, shape (n_samples, n_trees)"""
+        return self.model.apply(X)
+
+    def tree_predictions(self, X, leaves=None):
+        """Output of every tree for every row, shape (n_samples, n_trees)"""
+        if leaves is None:
+            leaves = self.leaves(X)
+        return np.take(self.node_values, leaves + self._offsets)
+
+    def predict_with_interval(self, X, coverage=0.9, method="percentile", leaves=None):
+        """
+        Predict with a spread across trees
+        Returns (mean, lower, upper, std), each of shape (n_samples,)
+        """
+        per_tree = self.tree_predictions(X, leaves)
+        mean = per_tree.mean(axis=1)
+        std = per_tree.std(axis=1)
+
+        if method == "percentile":
+            tail = (1.0 - coverage) / 2.0 * 100.0
+            lower, upper = np.percentile(per_tree, [tail, 100.0 - tail], axis=1)
+        elif method == "std":
+            z = NormalDist().inv_cdf(0.5 + coverage / 2.0)
+            lower, upper = mean - z * std, mean + z * std
+        else:
+            raise ValueError(f"Unknown interval method '{method}'")
+
+        return mean, lower, upper, std
+
+    def explain(self, X, leaves=None):
+        """
+        Per-feature contributions for every row, shape (n_samples, n_features)
+        For each row, bias + contributions.sum() equals the forest prediction
+        """
+        if leaves is None:
+            leaves = self.leaves(X)
+        per_tree = self.leaf_contributions[self.leaf_rows[leaves + self._offsets]]
+        # Average in float64 so the float32 rows add no drift across trees
+        return per_tree.mean(axis=1, dtype=np.float64)
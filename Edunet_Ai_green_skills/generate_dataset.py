@@ -0,0 +1,117 @@
+"""
+Synthetic dataset generator for scale and stress benchmarks
+Produces CSVs with the Datasets/*.csv schema, sampled from each real
+location's means and covariance. Output is deterministic for a given seed.
+
+Run: python generate_dataset.py OUT_DIR [--locations N] [--rows N]
+                                        [--missing-rate R] [--seed S]
+"""
+
+import argparse
+import os
+from glob import glob
+import numpy as np
+import pandas as pd
+
+from data_schema import TARGET_PEOPLE
+from stats_index import location_name_from_file
+
+# Configuration
+DATASETS_DIR = "Datasets"
+
+# Rows generated and written per chunk, bounds memory for large files
+CHUNK_ROWS = 200_000
+
+def location_profiles(datasets_dir=DATASETS_DIR):
+    """
+    Distribution of every real location: column order, mean vector,
+    covariance and observed range
+    """
+    profiles = []
+    for file in sorted(glob(os.path.join(datasets_dir, "*.csv"))):
+        df = pd.read_csv(file).dropna()
+        values = df.to_numpy(dtype=float)
+        profiles.append({
+            'name': location_name_from_file(file),
+            'columns': list(df.columns),
+            'mean': values.mean(axis=0),
+            'cov': np.cov(values, rowvar=False),
+            'min': values.min(axis=0),
+            'max': values.max(axis=0),
+        })
+    return profiles
+
+def generate_rows(profile, n_rows, rng, missing_rate=0.0, shift=None):
+    """
+    Sample n_rows readings for one location profile
+    shift moves the mean (in units of each column's std) so generated
+    locations beyond the real ones are not exact copies
+    """
+    mean = profile['mean']
+    std = np.sqrt(np.diag(profile['cov']))
+    if shift is not None:
+        mean = mean + shift * std
+
+    values = rng.multivariate_normal(mean, profile['cov'], size=n_rows, method='cholesky')
+    # Keep readings inside the observed range (moved with the mean)
+    offset = mean - profile['mean']
+    values = np.clip(values, profile['min'] + offset, profile['max'] + offset)
+
+    df = pd.DataFrame(values, columns=profile['columns'])
+    if missing_rate > 0:
+        # Blank random cells, like the gaps prepare_data drops
+        mask = rng.random(df.shape) < missing_rate
+        df = df.mask(mask)
+
+    if TARGET_PEOPLE in df.columns:
+        # Nullable integers keep whole counts alongside blanks
+        df[TARGET_PEOPLE] = df[TARGET_PEOPLE].round().clip(lower=0).astype('Int64')
+    return df
+
+def generate_corpus(out_dir, n_locations=12, rows_per_location=1000,
+                    missing_rate=0.0, seed=0, datasets_dir=DATASETS_DIR):
+    """
+    Write n_locations CSVs of rows_per_location rows each into out_dir
+    Locations cycle through the real profiles; every pass after the first
+    gets a deterministic shift so each generated location is distinct
+    Returns the list of written files
+    """
+    profiles = location_profiles(datasets_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    files = []
+    for i in range(n_locations):
+        profile = profiles[i % len(profiles)]
+        rng = np.random.default_rng([seed, i])
+        shift = None
+        if i >= len(profiles):
+            shift = rng.normal(0.0, 0.5, size=len(profile['columns']))
+
+        name = profile['name'] if i < len(profiles) else f"{profile['name']}_{i:04d}"
+        path = os.path.join(out_dir, f"{name}_dataset.csv")
+        remaining = rows_per_location
+        first = True
+        while remaining > 0:
+            n_rows = min(CHUNK_ROWS, remaining)
+            chunk = generate_rows(profile, n_rows, rng, missing_rate, shift)
+            chunk.to_csv(path, mode='w' if first else 'a', header=first, index=False)
+            remaining -= n_rows
+            first = False
+        files.append(path)
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic location datasets")
+    parser.add_argument("out_dir", help="directory to write the CSVs into")
+    parser.add_argument("--locations", type=int, default=12, help="number of locations")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per location")
+    parser.add_argument("--missing-rate", type=float, default=0.0,
+                        help="fraction of cells left blank")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    files = generate_corpus(args.out_dir, args.locations, args.rows, args.missing_rate, args.seed)
+    print(f"✓ Wrote {len(files)} datasets x {args.rows} rows to '{args.out_dir}'")
+
+if __name__ == "__main__":
+    main()
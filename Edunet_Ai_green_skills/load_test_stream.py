@@ -0,0 +1,110 @@
+"""
+Load test for the /ws/stream endpoint
+Opens many concurrent WebSocket streams against a running server, each
+subscribing to one location and pushing readings at a fixed rate, then
+reports throughput and prediction latency.
+
+Run: python load_test_stream.py [--url URL] [--connections N]
+                                [--duration S] [--rate R]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import numpy as np
+import requests
+import websockets
+
+BASE_URL = "http://localhost:8000"
+
+async def run_stream(url, location, defaults, duration, rate, results, ready):
+    """One client: subscribe, push readings, record prediction latency"""
+    async with websockets.connect(url, max_queue=None) as ws:
+        await ws.send(json.dumps({"action": "subscribe", "location": location}))
+        await ws.recv()
+        ready.append(1)
+
+        sent_at = []
+        stop = time.perf_counter() + duration
+
+        async def sender():
+            while time.perf_counter() < stop:
+                reading = {name: value * random.uniform(0.98, 1.02) for name, value in defaults.items()}
+                await ws.send(json.dumps({"action": "reading", "location": location, "reading": reading}))
+                sent_at.append(time.perf_counter())
+                results['sent'] += 1
+                await asyncio.sleep(1.0 / rate)
+
+        task = asyncio.create_task(sender())
+        try:
+            while True:
+                timeout = stop + 1.0 - time.perf_counter()
+                if timeout <= 0:
+                    break
+                message = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                if message["type"] == "prediction":
+                    results['predictions'] += 1
+                    if sent_at:
+                        # Time since this client's latest reading was sent
+                        results['latencies'].append(time.perf_counter() - sent_at[-1])
+                elif message["type"] == "error":
+                    results['errors'] += 1
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            task.cancel()
+
+def location_defaults(base_url, location):
+    """Location feature means under the /predict parameter names"""
+    features = requests.get(f"{base_url}/locations/{location}").json()["default_features"]
+    names = {
+        'Altitude': 'altitude', 'Pressure': 'pressure', 'Temperature': 'temperature',
+        'Humidity': 'humidity', 'WindSpeed': 'wind_speed', 'CO2': 'co2',
+        'PM2.5': 'pm25', 'NDVI': 'ndvi', 'PopulationDensity': 'population_density'
+    }
+    return {names[col]: value for col, value in features.items() if col in names}
+
+async def load_test(base_url, connections, duration, rate):
+    locations = requests.get(f"{base_url}/locations").json()["locations"]
+    defaults = {location: location_defaults(base_url, location) for location in locations}
+    ws_url = base_url.replace("http", "ws", 1) + "/ws/stream"
+
+    results = {'sent': 0, 'predictions': 0, 'errors': 0, 'latencies': []}
+    ready = []
+    print(f"\nOpening {connections} streams over {len(locations)} locations...")
+    start = time.perf_counter()
+    tasks = [
+        run_stream(ws_url, locations[i % len(locations)], defaults[locations[i % len(locations)]],
+                   duration, rate, results, ready)
+        for i in range(connections)
+    ]
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    failed = [o for o in outcomes if isinstance(o, Exception)]
+    latencies = np.array(results['latencies']) * 1000
+    print(f"✓ {len(ready)}/{connections} streams subscribed" + (f", {len(failed)} failed ({failed[0]!r})" if failed else ""))
+    print(f"  Readings sent:        {results['sent']} ({results['sent'] / elapsed:.0f}/s)")
+    print(f"  Predictions received: {results['predictions']} ({results['predictions'] / elapsed:.0f}/s)")
+    print(f"  Errors:               {results['errors']}")
+    if len(latencies):
+        print(f"  Latency p50/p99:      {np.percentile(latencies, 50):.1f} / {np.percentile(latencies, 99):.1f} ms")
+    print(f"  Server stream stats:  {requests.get(f'{base_url}/metrics').json()['stream']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the live stream endpoint")
+    parser.add_argument("--url", default=BASE_URL, help="API base URL")
+    parser.add_argument("--connections", type=int, default=1000, help="concurrent streams")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds each stream sends for")
+    parser.add_argument("--rate", type=float, default=1.0, help="readings per second per stream")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("STREAM LOAD TEST")
+    print("="*60)
+    asyncio.run(load_test(args.url, args.connections, args.duration, args.rate))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Versioned model registry
+Every published training run is copied into models/versions/v<N>/ with a
+manifest.json describing it: metrics, feature columns, targets, training
+parameters and a SHA-256 per artifact. Loading a version checks the
+hashes, so a candidate is always exactly the artifacts that were measured.
+
+Run: python model_registry.py   (lists the registered versions)
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+import joblib
+
+from digests import file_digest
+
+# Configuration
+MODELS_DIR = "models"
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+
+MODEL_FILES = ["oxygen_model.pkl", "people_model.pkl"]
+MANIFEST_FILE = "manifest.json"
+
+def parse_version(version):
+    """3, '3' or 'v3' -> 3"""
+    return int(str(version).lstrip('v'))
+
+
+class ModelRegistry:
+    """Published model versions under versions_dir"""
+
+    def __init__(self, versions_dir=VERSIONS_DIR):
+        self.versions_dir = versions_dir
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, f"v{parse_version(version)}")
+
+    def versions(self):
+        """Registered version numbers, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(int(name[1:]) for name in os.listdir(self.versions_dir)
+                      if name.startswith('v') and name[1:].isdigit())
+
+    def next_version(self):
+        return max(self.versions(), default=0) + 1
+
+    def register(self, models_dir, feature_info):
+        """
+        Copy the artifacts in models_dir into a new version with a manifest
+        feature_info is the model_info.json content (metrics, columns, ...)
+        Returns the manifest
+        """
+        version = self.next_version()
+        version_dir = self.version_dir(version)
+        os.makedirs(version_dir, exist_ok=True)
+        for name in MODEL_FILES + ["model_info.json"]:
+            shutil.copy2(os.path.join(models_dir, name), os.path.join(version_dir, name))
+
+        manifest = self._build_manifest(version, feature_info)
+        with open(os.path.join(version_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def _build_manifest(self, version, feature_info, created=None):
+        version_dir = self.version_dir(version)
+        return {
+            'version': version,
+            'created': created or datetime.now().isoformat(timespec='seconds'),
+            'feature_columns': feature_info['feature_columns'],
+            'target_oxygen': feature_info.get('target_oxygen'),
+            'target_people': feature_info.get('target_people'),
+            'model_params': feature_info.get('model_params'),
+            'training_key': feature_info.get('training_key'),
+            'metrics_oxygen': feature_info.get('metrics_oxygen'),
+            'metrics_people': feature_info.get('metrics_people'),
+            # Set instead of metrics_* for versions made by incremental updates
+            'incremental_updates': feature_info.get('incremental_updates'),
+            'artifacts': {
+                name: {
+                    'sha256': file_digest(os.path.join(version_dir, name)),
+                    'bytes': os.path.getsize(os.path.join(version_dir, name))
+                }
+                for name in MODEL_FILES
+            }
+        }
+
+    def manifest(self, version):
+        """
+        Manifest of a version
+        Versions published before manifests existed get one built from
+        their model_info.json on first access
+        """
+        version_dir = self.version_dir(version)
+        path = os.path.join(version_dir, MANIFEST_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+
+        info_path = os.path.join(version_dir, "model_info.json")
+        if not os.path.exists(info_path):
+            raise ValueError(f"Model version v{parse_version(version)} not found")
+        with open(info_path) as f:
+            feature_info = json.load(f)
+        created = datetime.fromtimestamp(os.path.getmtime(info_path)).isoformat(timespec='seconds')
+        manifest = self._build_manifest(parse_version(version), feature_info, created)
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def load(self, version):
+        """
+        (oxygen model, people model, manifest) for a version
+        Raises ValueError if an artifact no longer matches its recorded hash
+        """
+        manifest = self.manifest(version)
+        version_dir = self.version_dir(version)
+        models = []
+        for name in MODEL_FILES:
+            path = os.path.join(version_dir, name)
+            if file_digest(path) != manifest['artifacts'][name]['sha256']:
+                raise ValueError(f"{name} in v{manifest['version']} does not match its manifest hash")
+            models.append(joblib.load(path))
+        return models[0], models[1], manifest
+
+def main():
+    registry = ModelRegistry()
+    versions = registry.versions()
+    if not versions:
+        print(f"No model versions in '{registry.versions_dir}'. Run: python train_models.py")
+        return
+    print(f"{'Version':<9} {'Created':<21} {'Oxygen R²':<11} {'People R²':<11} {'Oxygen sha256':<14} Trained")
+    print(f"{'-'*80}")
+    for version in versions:
+        manifest = registry.manifest(version)
+        scores = []
+        for label in ('oxygen', 'people'):
+            r2 = (manifest.get(f'metrics_{label}') or {}).get('test_r2')
+            scores.append('-' if r2 is None else f"{r2:.4f}")
+        updates = manifest.get('incremental_updates')
+        if updates:
+            # Incremental versions have no test split; show the update instead
+            trained = f"+{updates[-1]['new_rows']} rows on v{updates[-1].get('base_version')}"
+        else:
+            trained = "full"
+        print(f"v{version:<8} {manifest['created']:<21} {scores[0]:<11} {scores[1]:<11} "
+              f"{manifest['artifacts']['oxygen_model.pkl']['sha256'][:12]:<14} {trained}")
+
+if __name__ == "__main__":
+    main()
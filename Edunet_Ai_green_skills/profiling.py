@@ -0,0 +1,178 @@
+"""
+Opt-in sampling profiler for inference requests
+A sampled request gets a short-lived thread that records the request
+thread's Python stack every interval. Identical stacks are counted and
+saved in collapsed format ("frame;frame;frame count" per line), which
+flamegraph.pl, inferno and speedscope read directly. Profiles go into a
+bounded ring on disk: once max_profiles are stored, the oldest is deleted.
+Unsampled requests only pay for one random number and a header check.
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+
+
+def frame_label(frame):
+    """'function (path:line)' with paths shortened to the package"""
+    code = frame.f_code
+    path = code.co_filename
+    marker = "site-packages" + os.sep
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """Samples one thread's stack until stopped"""
+
+    def __init__(self, label, interval):
+        self.label = label
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self.profile_id = None
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                # Collapsed stacks go from the root to the leaf
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Bounded ring of collapsed-stack files with a JSON index"""
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.index_file = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.entries = []
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                self.entries = [
+                    entry for entry in json.load(f)
+                    if os.path.exists(os.path.join(directory, entry['id']))
+                ]
+
+    def save(self, session):
+        """Write a finished session, evicting the oldest profiles; returns its id"""
+        with self._lock:
+            self._seq += 1
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            profile_id = f"{stamp}-{os.getpid()}-{self._seq:04d}-{session.label}.collapsed"
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, profile_id), "w") as f:
+                f.write(session.collapsed())
+
+            self.entries.append({
+                'id': profile_id,
+                'label': session.label,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'duration_ms': round(session.duration * 1000, 3),
+                'samples': session.samples,
+                'stacks': len(session.stacks),
+            })
+            while len(self.entries) > self.max_profiles:
+                oldest = self.entries.pop(0)
+                try:
+                    os.remove(os.path.join(self.directory, oldest['id']))
+                except FileNotFoundError:
+                    pass
+            with open(self.index_file, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            return profile_id
+
+    def list(self):
+        """Stored profiles, newest first"""
+        return list(reversed(self.entries))
+
+    def path(self, profile_id):
+        """File for a stored profile id, or None (ids outside the index are refused)"""
+        if any(entry['id'] == profile_id for entry in self.entries):
+            return os.path.join(self.directory, profile_id)
+        return None
+
+
+class Profiler:
+    """
+    Decides which requests to profile and records them
+    sample_rate is the fraction of requests profiled at random; a request
+    whose token matches admin_token is always profiled
+    """
+
+    def __init__(self, store, sample_rate=0.0, interval=0.001, admin_token=None):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.admin_token = admin_token
+        self.profiled = 0
+
+    def authorized(self, token):
+        """Whether token is the admin token (never when no token is configured)"""
+        if self.admin_token is None or token is None:
+            return False
+        # Constant time, so response timing does not leak the token
+        return hmac.compare_digest(token.encode(), self.admin_token.encode())
+
+    def session(self, label, token=None):
+        """
+        Context manager around a request's work, run in the request's thread
+        Yields a ProfileSession (its profile_id is set on exit) or None
+        """
+        forced = self.authorized(token)
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return nullcontext()
+        return _Recording(self, label)
+
+
+class _Recording:
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.session = ProfileSession(label, profiler.interval)
+
+    def __enter__(self):
+        self.session.start()
+        return self.session
+
+    def __exit__(self, *exc):
+        self.session.stop()
+        try:
+            self.session.profile_id = self.profiler.store.save(self.session)
+            self.profiler.profiled += 1
+        except OSError as e:
+            print(f"✗ Could not save profile: {e}")
+        return False
@@ -0,0 +1,96 @@
+"""
+Response encoding for the prediction endpoints
+Picks JSON or MessagePack from the Accept header. JSON uses orjson (a
+requirement) and falls back to pydantic's encoder, which is still faster
+than the standard library; MessagePack needs the optional msgpack package.
+"""
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # Listed in requirements.txt; pydantic encodes without it
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: binary responses
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Accepted media types -> the encoding used for them
+MEDIA_TYPES = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/*": JSON,
+    "*/*": JSON,
+}
+
+def encode_json_fallback(payload):
+    """JSON through pydantic's Rust encoder, used when orjson is missing"""
+    return pydantic_core.to_json(payload)
+
+def encode_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return encode_json_fallback(payload)
+
+def encode_msgpack(payload):
+    return msgpack.packb(payload, use_bin_type=True)
+
+def negotiate(accept):
+    """
+    Media type to respond with for an Accept header
+    Entries are tried in order of their q-value; MessagePack is skipped
+    when msgpack is not installed
+    """
+    if not accept:
+        return JSON
+
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, media_type.lower()))
+
+    for negative_quality, _, media_type in sorted(candidates):
+        encoding = MEDIA_TYPES.get(media_type)
+        if negative_quality < 0 and encoding is not None:
+            if encoding == MSGPACK and msgpack is None:
+                continue
+            return encoding
+
+    raise HTTPException(
+        status_code=406,
+        detail=f"Supported media types: {JSON}" + (f", {MSGPACK}" if msgpack is not None else "")
+    )
+
+def select_fields(prediction, fields):
+    """Keep only the requested fields of a prediction dict (location always kept)"""
+    if fields is None:
+        return prediction
+    return {key: value for key, value in prediction.items() if key in fields or key == 'location'}
+
+def parse_fields(fields):
+    """Comma-separated fields query parameter -> set, or None for all fields"""
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(",") if field.strip()}
+
+def render(payload, accept):
+    """Encode payload in the negotiated format"""
+    media_type = negotiate(accept)
+    if media_type == MSGPACK:
+        return Response(content=encode_msgpack(payload), media_type=MSGPACK)
+    return Response(content=encode_json(payload), media_type=JSON)
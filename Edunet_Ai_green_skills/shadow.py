@@ -0,0 +1,196 @@
+"""
+Shadow scoring of a candidate model version
+A sample of live prediction batches is handed to a background thread
+through a bounded queue. The thread scores each batch with the served
+global models and with the candidate, timing the same predict call on
+both, and records how far the candidate's predictions are from the served
+ones. Both sides are recomputed there, so the comparison is unaffected by
+per-location specialists, intervals or explanations in the request. The
+request never waits: when the queue is full the batch is dropped and
+counted instead.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# Recent latencies kept for percentiles
+LATENCY_WINDOW = 1000
+
+
+class RunningDiff:
+    """Agreement between served and candidate predictions for one target"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum_served = 0.0
+        self.sum_candidate = 0.0
+        self.sum_abs_diff = 0.0
+        self.sum_sq_diff = 0.0
+        self.max_abs_diff = 0.0
+
+    def add(self, served, candidate):
+        diff = candidate - served
+        self.count += len(diff)
+        self.sum_served += float(served.sum())
+        self.sum_candidate += float(candidate.sum())
+        self.sum_abs_diff += float(np.abs(diff).sum())
+        self.sum_sq_diff += float((diff ** 2).sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(np.abs(diff).max()))
+
+    def summary(self):
+        if not self.count:
+            return {'rows': 0}
+        return {
+            'rows': self.count,
+            'served_mean': round(self.sum_served / self.count, 6),
+            'candidate_mean': round(self.sum_candidate / self.count, 6),
+            # Positive when the candidate predicts higher on average
+            'mean_shift': round((self.sum_candidate - self.sum_served) / self.count, 6),
+            'mae': round(self.sum_abs_diff / self.count, 6),
+            'rmse': round(float(np.sqrt(self.sum_sq_diff / self.count)), 6),
+            'max_abs_diff': round(self.max_abs_diff, 6),
+        }
+
+
+def latency_summary(samples):
+    if not samples:
+        return {}
+    values = np.array(samples) * 1000
+    return {
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+    }
+
+
+class ShadowScorer:
+    """
+    Scores sampled live batches with a candidate version in the background
+    Results are also written to record_file (if given) every record_interval
+    seconds, so they outlive the process
+    """
+
+    def __init__(self, served_oxygen, served_people, oxygen_model, people_model, version,
+                 sample_rate=0.1, queue_size=64, record_file=None, record_interval=30.0):
+        self.served_oxygen = served_oxygen
+        self.served_people = served_people
+        self.oxygen_model = oxygen_model
+        self.people_model = people_model
+        self.version = version
+        self.sample_rate = sample_rate
+        self.record_file = record_file
+        self.record_interval = record_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Comparison state
+        self.oxygen = RunningDiff()
+        self.people = RunningDiff()
+        self.served_latency = deque(maxlen=LATENCY_WINDOW)
+        self.candidate_latency = deque(maxlen=LATENCY_WINDOW)
+        self.offered = 0
+        self.scored = 0
+        self.dropped = 0
+        self.errors = 0
+        self._last_record = time.monotonic()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._thread.start()
+        return self
+
+    def offer(self, X):
+        """Maybe queue a served batch's feature matrix for shadow scoring (never blocks)"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        self.offered += 1
+        try:
+            self._queue.put_nowait(X)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        # Lowest CPU priority for this thread (Linux), so on a busy machine
+        # the request threads win the cores
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            X = self._queue.get()
+            try:
+                self._score(X)
+            except Exception as e:
+                self.errors += 1
+                print(f"✗ Shadow scoring failed: {e}")
+            finally:
+                self._queue.task_done()
+            if self.record_file and time.monotonic() - self._last_record >= self.record_interval:
+                self.record()
+
+    @staticmethod
+    def _predict(oxygen_model, people_model, X):
+        """(oxygen, people, seconds) with the served post-processing of people"""
+        start = time.perf_counter()
+        oxygen = oxygen_model.predict(X)
+        people = np.maximum(1, people_model.predict(X).astype(int))
+        return oxygen, people, time.perf_counter() - start
+
+    def _score(self, X):
+        # Alternate which side goes first, so neither always runs on a cold cache
+        served_first = self.scored % 2 == 0
+        if served_first:
+            served = self._predict(self.served_oxygen, self.served_people, X)
+        candidate = self._predict(self.oxygen_model, self.people_model, X)
+        if not served_first:
+            served = self._predict(self.served_oxygen, self.served_people, X)
+        with self._lock:
+            self.oxygen.add(served[0], candidate[0])
+            self.people.add(served[1], candidate[1])
+            # The first batch pays one-off start-up costs (thread pools), skip its timing
+            if self.scored:
+                self.served_latency.append(served[2])
+                self.candidate_latency.append(candidate[2])
+            self.scored += 1
+
+    def wait_idle(self, timeout=10.0):
+        """Block until queued batches are scored (for tests and benchmarks)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self):
+        """Comparison so far, for the API and the record file"""
+        with self._lock:
+            return {
+                'candidate_version': self.version,
+                'sample_rate': self.sample_rate,
+                'batches_offered': self.offered,
+                'batches_scored': self.scored,
+                'batches_dropped': self.dropped,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+                'oxygen': self.oxygen.summary(),
+                'people': self.people.summary(),
+                'latency_served': latency_summary(self.served_latency),
+                'latency_candidate': latency_summary(self.candidate_latency),
+            }
+
+    def record(self):
+        """Write the current comparison to record_file"""
+        self._last_record = time.monotonic()
+        try:
+            with open(self.record_file, 'w') as f:
+                json.dump(self.stats(), f, indent=2)
+        except OSError as e:
+            print(f"✗ Could not write shadow results: {e}")
@@ -0,0 +1,129 @@
+"""
+Routing of predictions to per-location specialist models
+Specialists are loaded from disk on first use and kept in a bounded LRU,
+so memory stays flat however many locations have their own models
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+import joblib
+
+from forest_tables import ForestTables
+
+
+class ModelEntry:
+    """A loaded model with its tree tables built on first use"""
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+        self._tables = None
+
+    @property
+    def tables(self):
+        if self._tables is None:
+            self._tables = ForestTables(self.model)
+        return self._tables
+
+
+class SpecialistRouter:
+    """
+    Picks the oxygen and people models for a location
+    Falls back to the global models for locations or targets without
+    a specialist. max_resident=None keeps every indexed location resident.
+    """
+
+    def __init__(self, specialists_dir, global_oxygen, global_people, max_resident=None):
+        self.specialists_dir = specialists_dir
+        self.global_models = {'oxygen': global_oxygen, 'people': global_people}
+        self.max_resident = max_resident
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Which locations have which specialist targets, without loading any
+        self._index_file = os.path.join(specialists_dir, 'index.json')
+        self._index_stamp = self._stamp()
+        self.index = self._read_index()
+
+    def _stamp(self):
+        """(inode, size, mtime) of index.json, or None; changes when the directory is swapped"""
+        try:
+            info = os.stat(self._index_file)
+        except OSError:
+            return None
+        return (info.st_ino, info.st_size, info.st_mtime_ns)
+
+    def _read_index(self):
+        if not os.path.exists(self._index_file):
+            return {}
+        with open(self._index_file) as f:
+            return {name.lower(): set(targets) for name, targets in json.load(f).items()}
+
+    def reload(self):
+        """Re-read the index and drop resident models (after retraining)"""
+        # Stamped before reading, so a swap meanwhile is caught by the next refresh()
+        stamp = self._stamp()
+        index = self._read_index()
+        with self._lock:
+            self._index_stamp = stamp
+            self.index = index
+            self._resident.clear()
+
+    def refresh(self):
+        """
+        Reload if index.json changed since it was read (the specialists were
+        retrained), so resident models are never served after a swap
+        One stat call; run it once per request, before models_for()
+        """
+        if self._stamp() == self._index_stamp:
+            return False
+        self.reload()
+        return True
+
+    def _load(self, location):
+        """Load a location's specialists, evicting the least recently used"""
+        with self._lock:
+            if location in self._resident:
+                self._resident.move_to_end(location)
+                return self._resident[location]
+
+        entries = {}
+        for target in self.index[location]:
+            path = os.path.join(self.specialists_dir, location, f"{target}_model.pkl")
+            entries[target] = ModelEntry(joblib.load(path), location)
+
+        with self._lock:
+            self._resident[location] = entries
+            self._resident.move_to_end(location)
+            while len(self._resident) > self._capacity():
+                self._resident.popitem(last=False)
+        return entries
+
+    def _capacity(self):
+        return len(self.index) if self.max_resident is None else self.max_resident
+
+    def models_for(self, location):
+        """(oxygen entry, people entry) to use for a location"""
+        location = location.lower()
+        if location not in self.index:
+            return self.global_models['oxygen'], self.global_models['people']
+        try:
+            entries = self._load(location)
+        except FileNotFoundError:
+            # The specialists were retrained under us: pick up the new set
+            self.reload()
+            entries = self._load(location) if location in self.index else {}
+        return (entries.get('oxygen', self.global_models['oxygen']),
+                entries.get('people', self.global_models['people']))
+
+    def status(self):
+        """Summary for the health endpoint"""
+        with self._lock:
+            resident = list(self._resident)
+        return {
+            'available': len(self.index),
+            'resident': resident,
+            'max_resident': self._capacity()
+        }
@@ -0,0 +1,159 @@
+"""
+Precomputed per-location statistics
+One pass over each dataset gives means, min/max, quantiles and histograms.
+The index is saved as JSON and only files whose size or modification time
+changed are re-read, so the API can answer statistics queries without
+touching the raw CSVs.
+"""
+
+import json
+import os
+import threading
+import time
+from glob import glob
+import numpy as np
+import pandas as pd
+
+# Columns summarized for every location
+STATS_COLS = [
+    'Altitude', 'Pressure', 'Temperature', 'Humidity', 'WindSpeed',
+    'CO2', 'PM2.5', 'NDVI', 'PopulationDensity',
+    'Oxygen Level', 'Number of People'
+]
+
+# Columns that also get a histogram
+HISTOGRAM_COLS = ['CO2', 'PM2.5', 'Oxygen Level']
+HISTOGRAM_BINS = 20
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+def location_name_from_file(file):
+    """Location name from a dataset filename"""
+    return os.path.basename(file).replace("_dataset.csv", "").replace("_dataset_updated.csv", "")
+
+def json_float(value):
+    """JSON-safe float (NaN becomes None)"""
+    return None if np.isnan(value) else float(value)
+
+def compute_location_stats(df):
+    """Summary statistics for one location's dataframe"""
+    columns = [col for col in STATS_COLS if col in df.columns]
+    values = df[columns].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+
+    stats = {'rows': int(len(df)), 'columns': {}}
+    if len(df) == 0:
+        return stats
+
+    with np.errstate(invalid='ignore'):
+        # All columns in one vectorized call each; all-NaN columns give NaN
+        sums = np.where(present, values, 0.0).sum(axis=0)
+        means = np.divide(sums, counts, out=np.full(len(columns), np.nan), where=counts > 0)
+        minimums = np.fmin.reduce(values, axis=0)
+        maximums = np.fmax.reduce(values, axis=0)
+        quantiles = np.full((len(QUANTILES), len(columns)), np.nan)
+        if counts.any():
+            quantiles[:, counts > 0] = np.nanquantile(values[:, counts > 0], QUANTILES, axis=0)
+
+    for j, col in enumerate(columns):
+        summary = {
+            'count': int(counts[j]),
+            'mean': json_float(means[j]),
+            'min': json_float(minimums[j]),
+            'max': json_float(maximums[j]),
+            'quantiles': {str(q): json_float(quantiles[i, j]) for i, q in enumerate(QUANTILES)}
+        }
+        if col in HISTOGRAM_COLS and counts[j] > 0:
+            hist, edges = np.histogram(values[present[:, j], j], bins=HISTOGRAM_BINS)
+            summary['histogram'] = {
+                'counts': hist.tolist(),
+                'edges': [json_float(edge) for edge in edges]
+            }
+        stats['columns'][col] = summary
+    return stats
+
+
+class StatsIndex:
+    """Per-location statistics, kept in sync with the dataset files"""
+
+    def __init__(self, datasets_dir, index_file, refresh_interval=0.0):
+        self.datasets_dir = datasets_dir
+        self.index_file = index_file
+        self.refresh_interval = refresh_interval
+        self._last_refresh = None
+        self.entries = {}
+        if os.path.exists(index_file):
+            with open(index_file) as f:
+                self.entries = json.load(f)
+        self._by_lower = {name.lower(): name for name in self.entries}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(file):
+        info = os.stat(file)
+        return [info.st_size, info.st_mtime_ns]
+
+    def refresh(self, force=False):
+        """
+        Re-read only new or modified dataset files
+        Returns the names of locations whose statistics were recomputed
+        """
+        now = time.monotonic()
+        if (not force and self._last_refresh is not None
+                and now - self._last_refresh < self.refresh_interval):
+            return []
+        with self._lock:
+            self._last_refresh = now
+            return self._refresh()
+
+    def _refresh(self):
+        """Rebuild entries for changed files (caller holds the lock)"""
+        files = {location_name_from_file(file): file
+                 for file in glob(os.path.join(self.datasets_dir, "*.csv"))}
+        refreshed = []
+        entries = {}
+        for name, file in sorted(files.items()):
+            fingerprint = self._fingerprint(file)
+            entry = self.entries.get(name)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                entry = {
+                    'file': os.path.basename(file),
+                    'fingerprint': fingerprint,
+                    'stats': compute_location_stats(pd.read_csv(file))
+                }
+                refreshed.append(name)
+            entries[name] = entry
+
+        changed = bool(refreshed) or entries.keys() != self.entries.keys()
+        self.entries = entries
+        self._by_lower = {name.lower(): name for name in entries}
+        if changed:
+            self.save()
+        return refreshed
+
+    def save(self):
+        """Write the index as compact JSON"""
+        os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+        with open(self.index_file, 'w') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+
+    def fingerprints(self):
+        """{location: [size, mtime]} of the dataset file behind each entry"""
+        return {name: entry['fingerprint'] for name, entry in self.entries.items()}
+
+    def locations(self):
+        """Sorted location names"""
+        return sorted(self.entries)
+
+    def get(self, location):
+        """Statistics for a location (case-insensitive), or None"""
+        entry = self.entries.get(self._by_lower.get(location.lower()))
+        return None if entry is None else entry['stats']
+
+    def means(self, location):
+        """{column: mean} for a location, or None if unknown"""
+        stats = self.get(location)
+        if stats is None:
+            return None
+        return {col: summary['mean'] for col, summary in stats['columns'].items()}
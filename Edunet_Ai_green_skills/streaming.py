@@ -0,0 +1,184 @@
+"""
+Live sensor streams with rolling predictions
+Readings pushed over a WebSocket go into a fixed-size ring buffer per
+location. A background task periodically scores every location that
+received readings since the last flush, in a single batch, and pushes
+the updated predictions to that location's subscribers.
+"""
+
+import asyncio
+import json
+import time
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+
+class RingBuffer:
+    """Fixed-size window of the most recent feature vectors"""
+
+    def __init__(self, capacity, width):
+        self.data = np.zeros((capacity, width))
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+
+    def push(self, row):
+        self.data[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self):
+        """Filled part of the buffer (order does not matter for aggregates)"""
+        return self.data[:self.count]
+
+
+class StreamConnection:
+    """One WebSocket client with a bounded outgoing queue"""
+
+    def __init__(self, websocket, queue_size=32):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.locations = set()
+        self.dropped = 0
+
+    def send(self, message):
+        """Queue a message, dropping the oldest if the client is slow"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def pump(self):
+        """Forward queued messages to the socket until cancelled"""
+        while True:
+            message = await self.queue.get()
+            await self.websocket.send_text(message)
+
+
+class LocationStream:
+    """Rolling window and subscribers for one location"""
+
+    def __init__(self, window, width):
+        self.buffer = RingBuffer(window, width)
+        self.subscribers = set()
+        self.readings = 0
+
+
+class StreamHub:
+    """
+    Ring buffers and subscriptions for all locations in this worker
+    score(rows, locations) must return one prediction dict per row
+    """
+
+    def __init__(self, feature_cols, score, window=60, flush_interval=0.25,
+                 alert_below=20.0, queue_size=32):
+        self.feature_cols = feature_cols
+        self.score = score
+        self.window = window
+        self.flush_interval = flush_interval
+        self.alert_below = alert_below
+        self.queue_size = queue_size
+        self.streams = {}
+        self.connections = set()
+        self._dirty = set()
+        self._task = None
+
+        # Counters
+        self.readings = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """Start the flush loop on first use"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def connect(self, websocket):
+        connection = StreamConnection(websocket, self.queue_size)
+        self.connections.add(connection)
+        return connection
+
+    def disconnect(self, connection):
+        for location in connection.locations:
+            self.streams[location].subscribers.discard(connection)
+        self.connections.discard(connection)
+
+    def _stream(self, location):
+        if location not in self.streams:
+            self.streams[location] = LocationStream(self.window, len(self.feature_cols))
+        return self.streams[location]
+
+    def subscribe(self, connection, location):
+        self._stream(location).subscribers.add(connection)
+        connection.locations.add(location)
+
+    def push(self, location, row):
+        """Add one feature vector (in feature_cols order) to a location's window"""
+        stream = self._stream(location)
+        stream.buffer.push(row)
+        stream.readings += 1
+        self.readings += 1
+        self._dirty.add(location)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"✗ Stream flush failed: {e}")
+
+    def _aggregate(self, window):
+        """Reading count and per-feature mean, min and max of one window"""
+        aggregate = {'readings': len(window)}
+        for name, values in (('mean', window.mean(axis=0)),
+                             ('min', window.min(axis=0)),
+                             ('max', window.max(axis=0))):
+            aggregate[name] = dict(zip(self.feature_cols, values.tolist()))
+        return aggregate
+
+    async def flush(self):
+        """Score all locations with new readings in one batch and publish"""
+        if not self._dirty:
+            return
+        locations, self._dirty = sorted(self._dirty), set()
+        start = time.perf_counter()
+
+        # Aggregates are taken before the await: the windows are views into
+        # the ring buffers, which pushes may overwrite while scoring runs
+        aggregates = [self._aggregate(self.streams[location].buffer.window()) for location in locations]
+        rows = [aggregate['mean'] for aggregate in aggregates]
+        results = await run_in_threadpool(self.score, rows, locations)
+
+        for location, aggregate, result in zip(locations, aggregates, results):
+            stream = self.streams[location]
+            if not stream.subscribers:
+                continue
+            oxygen = result['predicted_oxygen_level']
+            message = json.dumps({
+                'type': 'prediction',
+                'location': location,
+                'window_readings': aggregate['readings'],
+                'total_readings': stream.readings,
+                'predicted_oxygen_level': round(oxygen, 4),
+                'predicted_number_of_people': result['predicted_number_of_people'],
+                'health_status': result['health_status'],
+                'alert': oxygen < self.alert_below,
+                'aggregates': {name: aggregate[name] for name in ('mean', 'min', 'max')}
+            })
+            for connection in stream.subscribers:
+                connection.send(message)
+
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        return {
+            'connections': len(self.connections),
+            'locations': len(self.streams),
+            'readings': self.readings,
+            'flushes': self.flushes,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'dropped_messages': sum(c.dropped for c in self.connections),
+        }
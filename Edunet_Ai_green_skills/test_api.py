@@ -3,10 +3,32 @@ Test script for the FastAPI backend
 """
 import requests
 import json
+import os
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from websockets.sync.client import connect
 
 BASE_URL = "http://localhost:8000"
 
+# Admin token of the server under test; /profiles is off without one
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+# Failed expectations, reported at the end (the script then exits with 1)
+failures = []
+
+def check(condition, message):
+    """Record and print a failed expectation"""
+    if not condition:
+        failures.append(message)
+        print(f"   ✗ {message}")
+    return condition
+
+def fail(test, error):
+    """Record a test that raised"""
+    failures.append(f"Test {test}: {error}")
+    print(f"   Error: {error}")
+
 def test_endpoints():
     """Test all API endpoints"""
     print("="*60)
@@ -25,7 +47,8 @@ def test_endpoints():
         print(f"   Response: {json.dumps(response.json(), indent=2)}")
     except Exception as e:
         print(f"   Error: {e}")
-        return
+        failures.append(f"API not reachable at {BASE_URL}")
+        return failures
     
     # Test 2: Health check
     print("\n2. Testing health check...")
@@ -33,8 +56,10 @@ def test_endpoints():
         response = requests.get(f"{BASE_URL}/health")
         print(f"   Status: {response.status_code}")
         print(f"   Response: {json.dumps(response.json(), indent=2)}")
+        health = response.json()
     except Exception as e:
         print(f"   Error: {e}")
+        health = {}
     
     # Test 3: Get locations
     print("\n3. Testing get locations...")
@@ -93,10 +118,251 @@ def test_endpoints():
     except Exception as e:
         print(f"   Error: {e}")
     
+    # Test 7: Prediction with per-tree intervals
+    print("\n7. Testing prediction with intervals...")
+    try:
+        payload = {"location": "ooty"}
+        response = requests.post(f"{BASE_URL}/predict", params={"intervals": "true", "coverage": 0.9}, json=payload)
+        print(f"   Status: {response.status_code}")
+        if check(response.status_code == 200, f"Test 7: status {response.status_code}: {response.text}"):
+            data = response.json()
+            print(f"   Predicted Oxygen Level: {data['predicted_oxygen_level']}")
+            print(f"   Oxygen Interval: {data['oxygen_interval']}")
+            print(f"   People Interval: {data['people_interval']}")
+            for name in ('oxygen_interval', 'people_interval'):
+                band = data[name]
+                check(band['lower'] <= band['upper'] and band['std'] >= 0,
+                      f"Test 7: {name} is not a valid band: {band}")
+                check(band['coverage'] == 0.9, f"Test 7: {name} coverage {band['coverage']}, expected 0.9")
+    except Exception as e:
+        fail(7, e)
+    
+    # Test 8: Batch prediction
+    print("\n8. Testing batch prediction...")
+    try:
+        payload = {"inputs": [{"location": "ooty"}, {"location": "manali", "co2": 450.0}]}
+        response = requests.post(f"{BASE_URL}/predict/batch", params={"intervals": "true"}, json=payload)
+        print(f"   Status: {response.status_code}")
+        if check(response.status_code == 200, f"Test 8: status {response.status_code}: {response.text}"):
+            data = response.json()
+            print(f"   Predictions: {data['count']}")
+            for item in data['predictions']:
+                print(f"   {item['location']}: {item['predicted_oxygen_level']} {item['oxygen_interval']}")
+                print(f"   Models used: {item['models_used']}")
+            check(data['count'] == 2 and len(data['predictions']) == 2,
+                  f"Test 8: expected 2 predictions, got {data['count']}")
+            check([item['location'] for item in data['predictions']] == ["ooty", "manali"],
+                  "Test 8: predictions are not in input order")
+            check(all(item['oxygen_interval'] for item in data['predictions']),
+                  "Test 8: intervals missing from batch predictions")
+    except Exception as e:
+        fail(8, e)
+    
+    # Test 9: Prediction with feature attributions
+    print("\n9. Testing prediction with explanation...")
+    try:
+        payload = {"location": "ooty", "co2": 460.0}
+        response = requests.post(f"{BASE_URL}/predict", params={"explain": "true"}, json=payload)
+        print(f"   Status: {response.status_code}")
+        if check(response.status_code == 200, f"Test 9: status {response.status_code}: {response.text}"):
+            data = response.json()
+            explanation = data['oxygen_explanation']
+            print(f"   Baseline: {explanation['bias']}")
+            top = sorted(explanation['contributions'].items(), key=lambda kv: abs(kv[1]), reverse=True)[:3]
+            print(f"   Top contributions: {top}")
+            # Attributions must add up to the prediction (values are rounded)
+            total = explanation['bias'] + sum(explanation['contributions'].values())
+            print(f"   Bias + contributions: {total:.4f} (prediction {data['predicted_oxygen_level']})")
+            check(abs(total - data['predicted_oxygen_level']) < 1e-3,
+                  f"Test 9: bias + contributions = {total}, prediction {data['predicted_oxygen_level']}")
+    except Exception as e:
+        fail(9, e)
+    
+    # Test 10: Location statistics
+    print("\n10. Testing location statistics (Ooty)...")
+    try:
+        response = requests.get(f"{BASE_URL}/locations/ooty/stats")
+        print(f"   Status: {response.status_code}")
+        if check(response.status_code == 200, f"Test 10: status {response.status_code}: {response.text}"):
+            data = response.json()
+            print(f"   Rows: {data['rows']}")
+            print(f"   CO2 quantiles: {data['columns']['CO2']['quantiles']}")
+            print(f"   CO2 histogram: {data['columns']['CO2']['histogram']['counts']}")
+            counts = data['columns']['CO2']['histogram']['counts']
+            check(data['rows'] > 0 and 0 < sum(counts) <= data['rows'],
+                  f"Test 10: histogram holds {sum(counts)} of {data['rows']} rows")
+            quantiles = list(data['columns']['CO2']['quantiles'].values())
+            check(quantiles == sorted(quantiles), f"Test 10: quantiles not increasing: {quantiles}")
+    except Exception as e:
+        fail(10, e)
+    
+    # Test 11: Cross-location comparison
+    print("\n11. Testing location comparison...")
+    try:
+        response = requests.get(f"{BASE_URL}/locations/compare", params={"locations": "ooty,manali", "columns": "CO2,PM2.5"})
+        print(f"   Status: {response.status_code}")
+        if check(response.status_code == 200, f"Test 11: status {response.status_code}: {response.text}"):
+            comparison = response.json()['comparison']
+            for col, by_location in comparison.items():
+                means = {name: summary['mean'] for name, summary in by_location.items() if summary}
+                print(f"   {col} means: {means}")
+            check(sorted(comparison) == ["CO2", "PM2.5"], f"Test 11: columns {sorted(comparison)}")
+            check(all(len([s for s in by_location.values() if s]) == 2 for by_location in comparison.values()),
+                  "Test 11: expected statistics for both locations")
+    except Exception as e:
+        fail(11, e)
+    
+    # Test 12: Nearest historical analogs
+    print("\n12. Testing nearest analogs...")
+    try:
+        payload = {"location": "ooty", "co2": 440.0}
+        response = requests.post(f"{BASE_URL}/analogs", params={"k": 3}, json=payload)
+        print(f"   Status: {response.status_code}")
+        if check(response.status_code == 200, f"Test 12: status {response.status_code}: {response.text}"):
+            neighbors = response.json()['neighbors']
+            for neighbor in neighbors:
+                print(f"   {neighbor['location']}: distance {neighbor['distance']}, "
+                      f"oxygen {neighbor['oxygen_level']}, people {neighbor['number_of_people']}")
+            distances = [neighbor['distance'] for neighbor in neighbors]
+            check(len(neighbors) == 3, f"Test 12: expected 3 neighbors, got {len(neighbors)}")
+            check(distances == sorted(distances), f"Test 12: neighbors not nearest first: {distances}")
+    except Exception as e:
+        fail(12, e)
+    
+    # Test 13: Out-of-range input is rejected
+    print("\n13. Testing out-of-range input...")
+    try:
+        payload = {"location": "ooty", "humidity": 120.0}
+        response = requests.post(f"{BASE_URL}/predict", json=payload)
+        print(f"   Status: {response.status_code} (expected 422)")
+        print(f"   Response: {json.dumps(response.json(), indent=2)}")
+        if check(response.status_code == 422, f"Test 13: status {response.status_code}, expected 422"):
+            violations = response.json()['detail']['violations']
+            check(any(v['column'] == 'Humidity' and v['rule'] == 'above_max' for v in violations),
+                  f"Test 13: Humidity above_max not reported: {violations}")
+    except Exception as e:
+        fail(13, e)
+    
+    # Test 14: Field selection and MessagePack responses
+    print("\n14. Testing field selection and content negotiation...")
+    try:
+        payload = {"location": "ooty"}
+        params = {"fields": "predicted_oxygen_level,health_status"}
+        response = requests.post(f"{BASE_URL}/predict", params=params, json=payload)
+        print(f"   Status: {response.status_code}")
+        print(f"   Response: {response.json()}")
+        if check(response.status_code == 200, f"Test 14: status {response.status_code}: {response.text}"):
+            check(sorted(response.json()) == ["health_status", "location", "predicted_oxygen_level"],
+                  f"Test 14: fields {sorted(response.json())}")
+        response = requests.post(f"{BASE_URL}/predict", params=params, json=payload,
+                                 headers={"Accept": "application/msgpack"})
+        print(f"   MessagePack status: {response.status_code}, "
+              f"{response.headers.get('content-type')}, {len(response.content)} bytes")
+        if response.status_code == 406:
+            print("   MessagePack not installed on the server (optional), skipped")
+        elif check(response.status_code == 200, f"Test 14: MessagePack status {response.status_code}"):
+            check(response.headers.get('content-type', '').startswith("application/msgpack"),
+                  f"Test 14: content type {response.headers.get('content-type')}")
+    except Exception as e:
+        fail(14, e)
+    
+    # Test 15: Admission control under a burst, and its counters
+    print("\n15. Testing admission control and metrics...")
+    try:
+        payload = {"inputs": [{"location": "ooty", "co2": 400.0 + i % 50} for i in range(300)]}
+        burst = lambda _: requests.post(f"{BASE_URL}/predict/batch", params={"intervals": "true"}, json=payload)
+        with ThreadPoolExecutor(max_workers=48) as pool:
+            responses = list(pool.map(burst, range(48)))
+        statuses = [r.status_code for r in responses]
+        rejected = [r for r in responses if r.status_code in (429, 503)]
+        print(f"   Burst of 48: {statuses.count(200)} served, {len(rejected)} shed")
+        check(all(status in (200, 429, 503) for status in statuses), f"Test 15: unexpected statuses {set(statuses)}")
+        # Whether any are shed depends on the machine; every shed one must say when to retry
+        check(all(int(r.headers.get('Retry-After', 0)) >= 1 for r in rejected),
+              "Test 15: shed request without a Retry-After header")
+
+        response = requests.get(f"{BASE_URL}/metrics")
+        print(f"   Status: {response.status_code}")
+        print(f"   Admission: {json.dumps(response.json()['admission'], indent=2)}")
+        check(response.status_code == 200, f"Test 15: metrics status {response.status_code}")
+    except Exception as e:
+        fail(15, e)
+    
+    # Test 16: Live stream
+    print("\n16. Testing live stream...")
+    try:
+        with connect(BASE_URL.replace("http", "ws", 1) + "/ws/stream") as ws:
+            ws.send(json.dumps({"action": "subscribe", "location": "ooty"}))
+            print(f"   Subscribed: {ws.recv()}")
+            for co2 in [420.0, 425.0, 430.0]:
+                ws.send(json.dumps({"action": "reading", "location": "ooty", "reading": {"co2": co2}}))
+            update = json.loads(ws.recv(timeout=5))
+            print(f"   Window readings: {update['window_readings']}")
+            print(f"   Oxygen: {update['predicted_oxygen_level']}%, alert: {update['alert']}")
+            check(update['type'] == "prediction", f"Test 16: got a {update['type']} message")
+            check(1 <= update['window_readings'] <= 3, f"Test 16: window of {update['window_readings']} readings")
+            check(update['alert'] == (update['predicted_oxygen_level'] < 20),
+                  "Test 16: alert flag does not match the oxygen level")
+    except Exception as e:
+        fail(16, e)
+    
+    # Test 17: Stored profiles
+    print("\n17. Testing profiles list...")
+    try:
+        response = requests.get(f"{BASE_URL}/profiles")
+        print(f"   Status without token: {response.status_code}")
+        check(response.status_code in (403, 404), "Test 17: profiles readable without a token")
+        if PROFILE_TOKEN:
+            response = requests.get(f"{BASE_URL}/profiles", headers={"X-Profile-Token": PROFILE_TOKEN})
+            print(f"   Status with token: {response.status_code}")
+            if check(response.status_code == 200, f"Test 17: status {response.status_code}: {response.text}"):
+                print(f"   Profiles stored: {len(response.json()['profiles'])}")
+    except Exception as e:
+        fail(17, e)
+    
+    # Test 18: Model registry
+    print("\n18. Testing model registry...")
+    try:
+        response = requests.get(f"{BASE_URL}/models")
+        print(f"   Status: {response.status_code}")
+        models = response.json()
+        print(f"   Serving: v{models['serving_version']}, shadow: {models['shadow_version']}")
+        print(f"   Versions: {[v['version'] for v in models['versions']]}")
+        check(response.status_code == 200, f"Test 18: status {response.status_code}")
+        versions = [v['version'] for v in models['versions']]
+        check(models['serving_version'] is None or models['serving_version'] in versions,
+              f"Test 18: serving version {models['serving_version']} not registered")
+    except Exception as e:
+        fail(18, e)
+    
+    # Test 19: All locations in one call
+    print("\n19. Testing all-location predictions...")
+    try:
+        response = requests.get(f"{BASE_URL}/predict/locations")
+        print(f"   Status: {response.status_code}")
+        result = response.json()
+        print(f"   Model version: {result['model_version']}, locations: {result['count']}")
+        for prediction in result['predictions'][:3]:
+            print(f"   {prediction['location']}: {prediction['predicted_oxygen_level']}%, "
+                  f"{prediction['predicted_number_of_people']} people")
+        check(response.status_code == 200, f"Test 19: status {response.status_code}")
+        locations = requests.get(f"{BASE_URL}/locations").json()['locations']
+        check(sorted(p['location'] for p in result['predictions']) == sorted(locations),
+              "Test 19: predictions do not cover every location")
+        check(result['fingerprint'] == health.get('prediction_fingerprint'),
+              "Test 19: fingerprint differs from /health")
+    except Exception as e:
+        fail(19, e)
+    
     print("\n" + "="*60)
     print("TESTING COMPLETE")
     print("="*60)
+    if failures:
+        print(f"\n✗ {len(failures)} check(s) failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+    return failures
 
 if __name__ == "__main__":
-    test_endpoints()
+    sys.exit(1 if test_endpoints() else 0)
 
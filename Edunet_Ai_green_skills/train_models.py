@@ -7,28 +7,72 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+from sklearn.metrics import r2_score
 import joblib
+import contextlib
+import hashlib
+import io
+import json
 import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from glob import glob
 
+try:
+    import resource
+except ImportError:  # Not available on Windows; memory is then not reported
+    resource = None
+
+from analog_index import load_or_build
+from data_schema import FEATURE_COLS, SCHEMA, TARGET_OXYGEN, TARGET_PEOPLE, clean_frame, format_report
+from digests import file_digest
+from model_registry import ModelRegistry
+from stats_index import StatsIndex, location_name_from_file
+
 # Configuration
 DATASETS_DIR = "Datasets"
 MODELS_DIR = "models"
+CACHE_DIR = ".train_cache"
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+WATERMARKS_FILE = os.path.join(MODELS_DIR, "watermarks.json")
+ANALOG_INDEX_FILE = os.path.join(MODELS_DIR, "analog_index.pkl")
+SPECIALISTS_DIR = os.path.join(MODELS_DIR, "specialists")
+
+registry = ModelRegistry(VERSIONS_DIR)
+
+# Files produced by a training run (restored together on a cache hit)
+MODEL_ARTIFACTS = ["oxygen_model.pkl", "people_model.pkl", "model_info.json"]
+
+# RandomForest hyperparameters
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+}
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+# Bump whenever data preparation changes which rows or values reach the
+# models (2: schema range checks and duplicate removal), so cached runs
+# from the old pipeline are not reused
+PIPELINE_VERSION = 2
+
+# Trees added per incremental update
+INCREMENTAL_TREES = 20
 
-# Feature columns
-FEATURE_COLS = [
-    'Altitude', 'Pressure', 'Temperature', 'Humidity', 'WindSpeed',
-    'CO2', 'PM2.5', 'NDVI', 'PopulationDensity'
-]
+# Fewest complete rows a location needs for its own model of a target
+MIN_SPECIALIST_ROWS = 200
 
-# Target columns
-TARGET_OXYGEN = 'Oxygen Level'
-TARGET_PEOPLE = 'Number of People'
+# Rows predicted at a time when computing metrics
+METRIC_CHUNK_ROWS = 100_000
 
 def load_all_datasets(datasets_dir):
     """
     Load all CSV files from the datasets directory
+    Features are stored as float32 and the location as a category
     """
     print("Loading all datasets...")
     all_data = []
@@ -37,9 +81,9 @@ def load_all_datasets(datasets_dir):
     csv_files = glob(os.path.join(datasets_dir, "*.csv"))
     
     for file in csv_files:
-        location_name = os.path.basename(file).replace("_dataset.csv", "").replace("_dataset_updated.csv", "")
-        df = pd.read_csv(file)
-        df['Location'] = location_name
+        location_name = location_name_from_file(file)
+        df = pd.read_csv(file, dtype={col: np.float32 for col in FEATURE_COLS})
+        df['Location'] = pd.Categorical([location_name] * len(df))
         all_data.append(df)
         print(f"  ✓ Loaded {location_name}: {len(df)} rows")
     
@@ -50,32 +94,22 @@ def load_all_datasets(datasets_dir):
     
     return combined_data
 
-def prepare_data(df):
+def prepare_data(df, report_file=None):
     """
     Prepare features and targets from the dataframe
+    Rows with missing or physically impossible values, and duplicate rows,
+    are dropped by the schema in data_schema.py
     """
-    # Check for missing values in features and targets
-    print("\nChecking for missing values...")
+    print("\nValidating features and targets...")
+    df, report = clean_frame(df, FEATURE_COLS + [TARGET_OXYGEN, TARGET_PEOPLE])
+    print(format_report(report))
     
-    # Check features
-    feature_missing = df[FEATURE_COLS].isnull().sum()
-    if feature_missing.sum() > 0:
-        print(f"Missing values in features: \n{feature_missing[feature_missing > 0]}")
-    
-    # Check targets
-    target_missing = df[[TARGET_OXYGEN, TARGET_PEOPLE]].isnull().sum()
-    if target_missing.sum() > 0:
-        print(f"Missing values in targets: \n{target_missing[target_missing > 0]}")
-    
-    # Drop rows with any missing values (in features or targets)
-    initial_rows = len(df)
-    df = df.dropna(subset=FEATURE_COLS + [TARGET_OXYGEN, TARGET_PEOPLE])
-    final_rows = len(df)
-    
-    if initial_rows != final_rows:
-        print(f"Dropped {initial_rows - final_rows} rows with missing values")
+    if report_file is not None:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
     
     # Prepare features and targets
+    df = df.reindex(columns=FEATURE_COLS + [TARGET_OXYGEN, TARGET_PEOPLE])
     X = df[FEATURE_COLS].values
     y_oxygen = df[TARGET_OXYGEN].values
     y_people = df[TARGET_PEOPLE].values
@@ -86,46 +120,167 @@ def prepare_data(df):
     
     return X, y_oxygen, y_people
 
-def train_and_evaluate_model(X, y, model_name, test_size=0.2, random_state=42):
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def report_memory(stage, log=None):
+    """Print the peak RSS so far, and record it in log under stage"""
+    peak = peak_rss_mb()
+    if peak is None:
+        return
+    print(f"  [memory] {stage:<20} peak RSS {peak:,.0f} MB")
+    if log is not None:
+        log[stage] = round(peak, 1)
+
+def split_order(n_rows, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """
+    Row order that puts the train split first, and the train size
+    Same rows as train_test_split on the full arrays, so once arrays are in
+    this order X[:n_train] and X[n_train:] are the splits, as views
+    """
+    train_idx, test_idx = train_test_split(
+        np.arange(n_rows), test_size=test_size, random_state=random_state
+    )
+    return np.concatenate([train_idx, test_idx]), len(train_idx)
+
+def merge_reports(reports):
+    """Sum per-file clean_frame reports into one"""
+    merged = {'input_rows': 0, 'invalid_rows': 0, 'duplicate_rows': 0, 'output_rows': 0, 'violations': {}}
+    for report in reports:
+        for key in ('input_rows', 'invalid_rows', 'duplicate_rows', 'output_rows'):
+            merged[key] += report[key]
+        for rule, by_column in report['violations'].items():
+            totals = merged['violations'].setdefault(rule, {})
+            for col, count in by_column.items():
+                totals[col] = totals.get(col, 0) + count
+    return merged
+
+def _clean_training_file(file, columns):
+    """One dataset read (features as float32) and cleaned on columns"""
+    df = pd.read_csv(file, usecols=lambda col: col in columns,
+                     dtype={col: np.float32 for col in FEATURE_COLS})
+    cleaned, report = clean_frame(df, columns)
+    return cleaned.reindex(columns=columns), report
+
+def load_training_arrays(datasets_dir, report_file=None):
+    """
+    Memory-lean load + clean for a full training run
+    Two passes over the files, one file in memory at a time: the first
+    cleans each file only to count the rows it keeps, so the final arrays
+    can be allocated already in split_order; the second cleans it again and
+    writes its rows straight to their place. Peak memory is the final
+    arrays plus one file, for parsing every CSV twice. Duplicates are
+    still found per location, as in prepare_data.
+    Returns (X float32, y_oxygen, y_people, n_train); the first n_train
+    rows are the train split
+    """
+    print("Loading and validating datasets...")
+    columns = FEATURE_COLS + [TARGET_OXYGEN, TARGET_PEOPLE]
+    files = glob(os.path.join(datasets_dir, "*.csv"))
+    reports = []
+    for file in files:
+        _, report = _clean_training_file(file, columns)
+        reports.append(report)
+        print(f"  ✓ {location_name_from_file(file)}: {report['output_rows']} of {report['input_rows']} rows kept")
+
+    report = merge_reports(reports)
+    print(format_report(report))
+    if report_file is not None:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    # Features as float32, the dtype the forest trains on; targets stay float64
+    n_rows = report['output_rows']
+    order, n_train = split_order(n_rows)
+    destination = np.empty(n_rows, dtype=np.int64)
+    destination[order] = np.arange(n_rows)
+    X = np.empty((n_rows, len(FEATURE_COLS)), dtype=np.float32)
+    y_oxygen = np.empty(n_rows)
+    y_people = np.empty(n_rows)
+    offset = 0
+    for file, file_report in zip(files, reports):
+        cleaned, _ = _clean_training_file(file, columns)
+        if len(cleaned) != file_report['output_rows']:
+            raise RuntimeError(f"{file} changed while loading")
+        rows = destination[offset:offset + len(cleaned)]
+        X[rows] = cleaned[FEATURE_COLS].to_numpy(dtype=np.float32)
+        y_oxygen[rows] = cleaned[TARGET_OXYGEN].to_numpy(dtype=np.float64)
+        y_people[rows] = cleaned[TARGET_PEOPLE].to_numpy(dtype=np.float64)
+        offset += len(cleaned)
+        del cleaned
+
+    print(f"\nFeatures shape: {X.shape} ({X.nbytes / 1e6:.1f} MB float32)")
+    print(f"Train rows: {n_train}, test rows: {n_rows - n_train}")
+    return X, y_oxygen, y_people, n_train
+
+def chunked_metrics(model, X, y, chunk_rows=METRIC_CHUNK_ROWS):
+    """
+    R², MAE and RMSE of model on (X, y)
+    Predicts chunk_rows at a time and keeps running error sums, so no
+    full-length prediction array is held
+    """
+    abs_error = 0.0
+    squared_error = 0.0
+    for start in range(0, len(X), chunk_rows):
+        error = model.predict(X[start:start + chunk_rows]) - y[start:start + chunk_rows]
+        abs_error += float(np.abs(error).sum())
+        squared_error += float((error ** 2).sum())
+
+    total = float(((y - y.mean()) ** 2).sum())
+    if total == 0:
+        r2 = 1.0 if squared_error == 0 else 0.0
+    else:
+        r2 = 1.0 - squared_error / total
+    return r2, abs_error / len(y), float(np.sqrt(squared_error / len(y)))
+
+def new_forest(n_jobs=-1, random_state=RANDOM_STATE):
+    """Unfitted RandomForest with the project's hyperparameters"""
+    return RandomForestRegressor(**MODEL_PARAMS, random_state=random_state, n_jobs=n_jobs)
+
+def fit_in_worker(X, y):
+    """
+    Fit a forest inside a process pool worker
+    One core per worker; the pool provides the parallelism
+    """
+    model = new_forest(n_jobs=1)
+    model.fit(X, y)
+    return model
+
+def train_and_evaluate_model(X, y, model_name, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                             n_jobs=-1, n_train=None):
     """
     Train a RandomForest model and evaluate it
+    With n_train, X and y are already in split_order and the splits are
+    views; otherwise they are reordered (copied) here
     """
     print(f"\n{'='*60}")
     print(f"Training {model_name}")
     print(f"{'='*60}")
     
     # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state
-    )
+    if n_train is None:
+        order, n_train = split_order(len(X), test_size, random_state)
+        X, y = X[order], y[order]
+    X_train, X_test = X[:n_train], X[n_train:]
+    y_train, y_test = y[:n_train], y[n_train:]
     
     print(f"Training set size: {len(X_train)}")
     print(f"Test set size: {len(X_test)}")
     
     # Initialize and train the model
-    model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=random_state,
-        n_jobs=-1
-    )
+    model = new_forest(n_jobs, random_state)
     
     print("\nTraining model...")
     model.fit(X_train, y_train)
     
-    # Make predictions
-    y_train_pred = model.predict(X_train)
-    y_test_pred = model.predict(X_test)
-    
-    # Calculate metrics
-    train_r2 = r2_score(y_train, y_train_pred)
-    test_r2 = r2_score(y_test, y_test_pred)
-    train_mae = mean_absolute_error(y_train, y_train_pred)
-    test_mae = mean_absolute_error(y_test, y_test_pred)
-    train_rmse = np.sqrt(mean_squared_error(y_train, y_train_pred))
-    test_rmse = np.sqrt(mean_squared_error(y_test, y_test_pred))
+    # Calculate metrics, predicting in chunks
+    train_r2, train_mae, train_rmse = chunked_metrics(model, X_train, y_train)
+    test_r2, test_mae, test_rmse = chunked_metrics(model, X_test, y_test)
     
     # Display results
     print(f"\n{'='*60}")
@@ -166,44 +321,360 @@ def save_model(model, filename):
     joblib.dump(model, filepath)
     print(f"✓ Model saved to: {filepath}")
 
-def main():
+def dataset_digests(datasets_dir):
+    """Content hash of every dataset, keyed by file path"""
+    return {
+        file: file_digest(file)
+        for file in sorted(glob(os.path.join(datasets_dir, "*.csv")))
+    }
+
+def training_key(digests):
+    """
+    Hash of everything that determines the trained models: dataset
+    contents, cleaning (schema and pipeline version), feature config and
+    hyperparameters
+    """
+    config = {
+        'datasets': sorted(digests.values()),
+        'schema': SCHEMA,
+        'pipeline_version': PIPELINE_VERSION,
+        'feature_columns': FEATURE_COLS,
+        'targets': [TARGET_OXYGEN, TARGET_PEOPLE],
+        'model_params': MODEL_PARAMS,
+        'test_size': TEST_SIZE,
+        'random_state': RANDOM_STATE,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+def restore_cached_run(key):
+    """
+    Copy artifacts of a previous identical run into MODELS_DIR
+    Returns the cached model info, or None on a cache miss
+    """
+    run_dir = os.path.join(CACHE_DIR, "runs", key)
+    if not all(os.path.exists(os.path.join(run_dir, name)) for name in MODEL_ARTIFACTS):
+        return None
+
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    for name in MODEL_ARTIFACTS:
+        shutil.copy2(os.path.join(run_dir, name), os.path.join(MODELS_DIR, name))
+    with open(os.path.join(MODELS_DIR, 'model_info.json')) as f:
+        return json.load(f)
+
+def store_cached_run(key):
+    """Keep a copy of this run's artifacts under its training key"""
+    run_dir = os.path.join(CACHE_DIR, "runs", key)
+    os.makedirs(run_dir, exist_ok=True)
+    for name in MODEL_ARTIFACTS:
+        shutil.copy2(os.path.join(MODELS_DIR, name), os.path.join(run_dir, name))
+
+def update_location_stats():
+    """
+    Per-location statistics stage
+    Only datasets whose files changed since the last run are re-read
+    """
+    index = StatsIndex(DATASETS_DIR, os.path.join(MODELS_DIR, 'location_stats.json'))
+    refreshed = index.refresh()
+    if refreshed:
+        print(f"✓ Location statistics refreshed: {', '.join(refreshed)}")
+    else:
+        print("✓ Location statistics unchanged (cached)")
+    return refreshed
+
+def update_analog_index(digests):
+    """
+    Rebuild the nearest-analog index unless it was built from exactly
+    these dataset contents (digests as returned by dataset_digests)
+    """
+    digests = {os.path.basename(file): digest for file, digest in digests.items()}
+    index, rebuilt = load_or_build(ANALOG_INDEX_FILE, DATASETS_DIR, digests)
+    if rebuilt:
+        print(f"✓ Analog index rebuilt: {len(index)} readings")
+    else:
+        print("✓ Analog index unchanged (cached)")
+
+def publish_version(feature_info):
+    """
+    Write model_info.json and register the current artifacts as
+    models/versions/v<N>/ with a manifest, so earlier versions stay available
+    """
+    feature_info['version'] = registry.next_version()
+    with open(os.path.join(MODELS_DIR, 'model_info.json'), 'w') as f:
+        json.dump(feature_info, f, indent=2)
+
+    manifest = registry.register(MODELS_DIR, feature_info)
+    print(f"✓ Published model version v{manifest['version']} "
+          f"(oxygen {manifest['artifacts']['oxygen_model.pkl']['sha256'][:12]})")
+    return manifest['version']
+
+def _tail_digest(path, offset, size=256):
+    """Hash of the bytes just before offset, to detect rewritten files"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - size))
+        return hashlib.sha256(f.read(offset - max(0, offset - size))).hexdigest()
+
+def write_watermarks(files):
+    """Record how far into each dataset the current models have read"""
+    watermarks = {}
+    for file in files:
+        offset = os.path.getsize(file)
+        watermarks[os.path.basename(file)] = {
+            'offset': offset,
+            'tail_digest': _tail_digest(file, offset)
+        }
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    with open(WATERMARKS_FILE, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    return watermarks
+
+def read_appended_rows(file, mark):
+    """
+    Read only the complete rows written after the watermark
+    Returns (rows, new watermark); rows is None if the file was rewritten
+    """
+    with open(file, 'rb') as f:
+        header = f.readline()
+        offset = mark['offset'] if mark else len(header)
+        if mark and (os.path.getsize(file) < offset or _tail_digest(file, offset) != mark['tail_digest']):
+            return None, mark
+        f.seek(offset)
+        data = f.read()
+
+    # Leave a partially written last line for the next run
+    data = data[:data.rfind(b'\n') + 1]
+    new_offset = offset + len(data)
+    new_mark = {'offset': new_offset, 'tail_digest': _tail_digest(file, new_offset)}
+    if not data.strip():
+        return pd.DataFrame(), new_mark
+    return pd.read_csv(io.BytesIO(header + data)), new_mark
+
+def grow_forest(model, X, y, new_trees, retire_oldest=False):
+    """
+    Warm-start new_trees extra trees on (X, y)
+    With retire_oldest, drop as many of the oldest trees so the ensemble
+    keeps a constant size and slides toward recent data
+    """
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+    model.fit(X, y)
+    if retire_oldest:
+        model.estimators_ = model.estimators_[new_trees:]
+        model.set_params(n_estimators=len(model.estimators_))
+    model.set_params(warm_start=False)
+    return model
+
+def incremental_update(new_trees=INCREMENTAL_TREES, retire_oldest=False):
+    """
+    Update the published models with rows appended since the last run
+    Only the new bytes of each dataset are read, so the cost scales with
+    the new data rather than the full history
+    """
+    print("="*60)
+    print("INCREMENTAL MODEL UPDATE")
+    print("="*60)
+
+    if not os.path.exists(WATERMARKS_FILE):
+        print("No watermarks found. Run a full training first: python train_models.py")
+        return None
+    with open(WATERMARKS_FILE) as f:
+        watermarks = json.load(f)
+
+    new_data = []
+    for file in sorted(glob(os.path.join(DATASETS_DIR, "*.csv"))):
+        name = os.path.basename(file)
+        rows, watermarks[name] = read_appended_rows(file, watermarks.get(name))
+        if rows is None:
+            print(f"✗ {name} was rewritten, not appended. Run a full training instead.")
+            return None
+        if len(rows):
+            rows['Location'] = location_name_from_file(file)
+            new_data.append(rows)
+            print(f"  ✓ {location_name_from_file(file)}: {len(rows)} new rows")
+
+    if not new_data:
+        print("No new rows since the last run. Models unchanged.")
+        return None
+
+    X, y_oxygen, y_people = prepare_data(pd.concat(new_data, ignore_index=True))
+    if len(X) == 0:
+        print("No complete new rows to learn from. Models unchanged.")
+        return None
+
+    with open(os.path.join(MODELS_DIR, 'model_info.json')) as f:
+        feature_info = json.load(f)
+    # The full run's test metrics, training key and memory log describe other
+    # artifacts; this version is described by its incremental_updates instead
+    for name in ('training_key', 'metrics_oxygen', 'metrics_people', 'peak_rss_mb'):
+        feature_info.pop(name, None)
+
+    update = {
+        'base_version': feature_info.get('version'),
+        'new_rows': int(len(X)),
+        'new_trees': new_trees,
+        'retire_oldest': retire_oldest
+    }
+    for filename, y, label in (("oxygen_model.pkl", y_oxygen, 'oxygen'),
+                               ("people_model.pkl", y_people, 'people')):
+        model = joblib.load(os.path.join(MODELS_DIR, filename))
+        # How well the current model handled the new rows, before learning them
+        if len(X) > 1:
+            update[f'{label}_r2_before'] = r2_score(y, model.predict(X))
+        grow_forest(model, X, y, new_trees, retire_oldest)
+        update[f'{label}_trees'] = len(model.estimators_)
+        save_model(model, filename)
+
+    # Both forests grow the same way, so one tree count describes them
+    trees = {update['oxygen_trees'], update['people_trees']}
+    feature_info['model_params'] = {
+        **feature_info.get('model_params', MODEL_PARAMS),
+        'n_estimators': trees.pop() if len(trees) == 1
+                        else {'oxygen': update['oxygen_trees'], 'people': update['people_trees']}
+    }
+    feature_info.setdefault('incremental_updates', []).append(update)
+    with open(WATERMARKS_FILE, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    publish_version(feature_info)
+    print(f"\n✓ Updated with {len(X)} rows ({new_trees} trees added"
+          f"{', oldest retired' if retire_oldest else ''})")
+    return update
+
+def _train_specialist(file, output_dir):
+    """
+    Train one location's models (runs in a worker process)
+    The dataset is read here rather than in the parent, so only one
+    location's rows are in memory per worker
+    A target is skipped when the location has too few complete rows for it
+    """
+    location_name = location_name_from_file(file)
+    df = pd.read_csv(file)
+    location_dir = os.path.join(output_dir, location_name)
+    trained = {}
+    for label, target, filename in (('oxygen', TARGET_OXYGEN, "oxygen_model.pkl"),
+                                    ('people', TARGET_PEOPLE, "people_model.pkl")):
+        if target not in df.columns:
+            continue
+        rows, _ = clean_frame(df, FEATURE_COLS + [target])
+        if len(rows) < MIN_SPECIALIST_ROWS:
+            continue
+        # Runs in a pool worker, so one core (as in fit_in_worker)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model, metrics = train_and_evaluate_model(
+                rows[FEATURE_COLS].values, rows[target].values,
+                f"{location_name} {label}", n_jobs=1
+            )
+        os.makedirs(location_dir, exist_ok=True)
+        joblib.dump(model, os.path.join(location_dir, filename))
+        trained[label] = metrics
+    return location_name, trained
+
+def train_specialists(max_workers=None):
+    """
+    Train per-location specialist models in parallel across processes
+    The API routes requests to these by location and falls back to the
+    global models for any location or target without a specialist
+    """
+    print("="*60)
+    print("PER-LOCATION SPECIALIST MODELS")
+    print("="*60)
+
+    # Train into a fresh staging directory (so removed locations do not
+    # linger) and only swap it in when complete, so a running API never
+    # sees a half-written or missing set of specialists for long
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix="specialists.", dir=MODELS_DIR)
+
+    files = sorted(glob(os.path.join(DATASETS_DIR, "*.csv")))
+    index = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_train_specialist, file, staging_dir) for file in files]
+        for future in futures:
+            location_name, trained = future.result()
+            if not trained:
+                print(f"  - {location_name}: not enough data, uses global models")
+                continue
+            index[location_name] = trained
+            scores = ", ".join(f"{label} R² {m['test_r2']:.4f}" for label, m in trained.items())
+            print(f"  ✓ {location_name}: {scores}")
+
+    with open(os.path.join(staging_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+
+    # Swap with renames; the previous set is deleted only once replaced
+    retired_dir = None
+    if os.path.exists(SPECIALISTS_DIR):
+        retired_dir = staging_dir + ".old"
+        os.replace(SPECIALISTS_DIR, retired_dir)
+    os.replace(staging_dir, SPECIALISTS_DIR)
+    if retired_dir:
+        shutil.rmtree(retired_dir, ignore_errors=True)
+
+    print(f"\n✓ {len(index)} specialist locations saved in '{SPECIALISTS_DIR}'")
+    return index
+
+def main(use_cache=True):
     """
     Main execution function
+    With use_cache, an unchanged set of datasets, features and
+    hyperparameters reuses the previous run's models and metrics
     """
     print("="*60)
     print("PHASE 2: MODEL DEVELOPMENT")
     print("="*60)
     
-    # Load all datasets
-    df = load_all_datasets(DATASETS_DIR)
+    # Hash inputs and refresh per-location statistics for changed files
+    digests = dataset_digests(DATASETS_DIR)
+    key = training_key(digests)
+    update_location_stats()
+    update_analog_index(digests)
     
-    # Prepare data
-    X, y_oxygen, y_people = prepare_data(df)
+    if use_cache:
+        cached_info = restore_cached_run(key)
+        if cached_info is not None:
+            print(f"\n✓ Inputs unchanged (key {key[:12]}), reused cached models")
+            print(f"  • Oxygen Model R² Score: {cached_info['metrics_oxygen']['test_r2']:.4f}")
+            print(f"  • People Model R² Score: {cached_info['metrics_people']['test_r2']:.4f}")
+            write_watermarks(digests)
+            return
+    
+    memory = {}
+    report_memory("start", memory)
+    
+    # Load and validate all datasets, already split (float32 features)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    X, y_oxygen, y_people, n_train = load_training_arrays(
+        DATASETS_DIR, os.path.join(MODELS_DIR, 'validation_report.json')
+    )
+    report_memory("load + validate", memory)
     
     # Train Oxygen Level model
     model_oxygen, metrics_oxygen = train_and_evaluate_model(
-        X, y_oxygen, "Oxygen Level Prediction Model"
+        X, y_oxygen, "Oxygen Level Prediction Model", n_train=n_train
     )
     save_model(model_oxygen, "oxygen_model.pkl")
+    del model_oxygen
+    report_memory("oxygen model", memory)
     
     # Train Number of People model
     model_people, metrics_people = train_and_evaluate_model(
-        X, y_people, "Number of People Prediction Model"
+        X, y_people, "Number of People Prediction Model", n_train=n_train
     )
     save_model(model_people, "people_model.pkl")
+    report_memory("people model", memory)
     
     # Save feature information
     feature_info = {
         'feature_columns': FEATURE_COLS,
         'target_oxygen': TARGET_OXYGEN,
         'target_people': TARGET_PEOPLE,
+        'model_params': MODEL_PARAMS,
+        'training_key': key,
         'metrics_oxygen': metrics_oxygen,
-        'metrics_people': metrics_people
+        'metrics_people': metrics_people,
+        'peak_rss_mb': memory
     }
     
-    import json
-    with open(os.path.join(MODELS_DIR, 'model_info.json'), 'w') as f:
-        json.dump(feature_info, f, indent=2)
+    publish_version(feature_info)
+    write_watermarks(digests)
+    store_cached_run(key)
     
     print("\n" + "="*60)
     print("PHASE 2 COMPLETED SUCCESSFULLY!")
@@ -215,5 +686,13 @@ def main():
     print(f"  • People Model R² Score: {metrics_people['test_r2']:.4f}")
 
 if __name__ == "__main__":
-    main()
+    args = sys.argv[1:]
+    if "--specialists" in args:
+        train_specialists()
+    elif "--incremental" in args:
+        # --retire drops the oldest trees to keep the ensemble size fixed
+        incremental_update(retire_oldest="--retire" in args)
+    else:
+        # --no-cache forces a full retrain
+        main(use_cache="--no-cache" not in args)
 